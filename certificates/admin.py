@@ -3,8 +3,9 @@ from .models import Certificate
 
 @admin.register(Certificate)
 class CertificateAdmin(admin.ModelAdmin):
-    list_display = ['certificate_id', 'enrollment', 'issued_at']
-    list_filter = ['issued_at']
+    list_display = ['certificate_id', 'enrollment', 'status', 'issued_at', 'rendered_at', 'render_ms']
+    list_filter = ['status', 'issued_at']
     search_fields = ['certificate_id', 'enrollment__student__username', 'enrollment__course__title']
     raw_id_fields = ['enrollment']
-    date_hierarchy = 'issued_at'
\ No newline at end of file
+    date_hierarchy = 'issued_at'
+    readonly_fields = ['status', 'queued_at', 'render_started_at', 'rendered_at', 'render_ms', 'attempts', 'error']
\ No newline at end of file
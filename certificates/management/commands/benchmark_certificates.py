@@ -0,0 +1,54 @@
+import statistics
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from certificates.models import Certificate
+from certificates.rendering import CertificateRenderer
+from courses.models import Course, Enrollment
+from users.models import User
+
+
+def _sample_certificate(index):
+    """An unsaved certificate; rendering never touches the database"""
+    student = User(username=f'student{index}', first_name='Sample', last_name=f'Student {index}')
+    course = Course(title=f'Benchmark Course {index}')
+    return Certificate(
+        enrollment=Enrollment(student=student, course=course),
+        certificate_id=uuid.uuid4(),
+        issued_at=timezone.now(),
+    )
+
+
+class Command(BaseCommand):
+    help = 'Compare cold (new renderer per document) and warm (shared renderer) certificate render latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        certificates = [_sample_certificate(i) for i in range(iterations)]
+
+        cold = []
+        for certificate in certificates:
+            started = time.perf_counter()
+            CertificateRenderer().render(certificate)
+            cold.append((time.perf_counter() - started) * 1000)
+
+        renderer = CertificateRenderer()
+        renderer.render(certificates[0])
+        warm = []
+        for certificate in certificates:
+            started = time.perf_counter()
+            renderer.render(certificate)
+            warm.append((time.perf_counter() - started) * 1000)
+
+        for label, timings in (('cold', cold), ('warm', warm)):
+            self.stdout.write(
+                f'{label}: mean {statistics.mean(timings):.1f} ms, median {statistics.median(timings):.1f} ms, '
+                f'max {max(timings):.1f} ms over {iterations} documents'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Warm renders are {statistics.mean(cold) / statistics.mean(warm):.1f}x faster on average.'
+        ))
@@ -0,0 +1,49 @@
+import multiprocessing
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from certificates.models import Certificate
+from certificates.rendering import get_renderer, queue_stats, render_certificate
+
+
+def _init_worker():
+    # Forked workers must not share the parent's database connections
+    connections.close_all()
+    get_renderer()
+
+
+class Command(BaseCommand):
+    help = 'Render queued certificates with a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.CERTIFICATE_WORKER_PROCESSES)
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is drained')
+
+    def handle(self, *args, **options):
+        connections.close_all()
+        with multiprocessing.Pool(options['processes'], initializer=_init_worker) as pool:
+            while True:
+                batch = list(
+                    Certificate.objects.renderable(settings.CERTIFICATE_RENDER_TIMEOUT)
+                    .order_by('queued_at')
+                    .values_list('pk', flat=True)[:options['batch_size']]
+                )
+                if not batch:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+
+                started = time.perf_counter()
+                timings = [ms for ms in pool.imap_unordered(render_certificate, batch) if ms is not None]
+                elapsed = time.perf_counter() - started
+                stats = queue_stats()
+                self.stdout.write(
+                    f'Rendered {len(timings)}/{len(batch)} in {elapsed:.1f}s '
+                    f'(avg {sum(timings) / len(timings) if timings else 0:.0f} ms); '
+                    f'pending {stats["pending"]}, failed {stats["failed"]}'
+                )
+        self.stdout.write(self.style.SUCCESS('Certificate queue drained.'))
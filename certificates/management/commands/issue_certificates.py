@@ -0,0 +1,103 @@
+import multiprocessing
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Max
+from django.utils import timezone
+from certificates.models import Certificate
+from certificates.rendering import get_renderer, record_failure, save_pdf
+from courses.models import Enrollment
+
+
+def _init_worker():
+    connections.close_all()
+    # Parse the template, stylesheet and fonts once per worker rather than per document
+    get_renderer()
+
+
+def _render(certificate):
+    """Render and store one PDF in a worker; returns (pk, pdf name, ms, error)"""
+    started = time.perf_counter()
+    try:
+        name = save_pdf(certificate, get_renderer().render(certificate))
+    except Exception as exc:
+        return certificate.pk, None, 0, str(exc)[:2000]
+    return certificate.pk, name, round((time.perf_counter() - started) * 1000), ''
+
+
+class Command(BaseCommand):
+    help = 'Create and render certificates for every fully completed enrollment, across a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.CERTIFICATE_WORKER_PROCESSES)
+        parser.add_argument('--chunk-size', type=int, default=200, help='Certificates claimed and written per round')
+        parser.add_argument('--course', help='Only enrollments in this course')
+
+    def handle(self, *args, **options):
+        enrollments = Enrollment.objects.filter(progress_percentage__gte=100, certificate__isnull=True)
+        if options['course']:
+            enrollments = enrollments.filter(course_id=options['course'])
+
+        # Queue rows first so an interrupted run picks up where it stopped
+        now = timezone.now()
+        last_pk = Certificate.objects.aggregate(last=Max('pk'))['last'] or 0
+        Certificate.objects.bulk_create(
+            [Certificate(enrollment_id=pk, status=Certificate.PENDING, queued_at=now)
+             for pk in enrollments.values_list('pk', flat=True).iterator()],
+            batch_size=1000, ignore_conflicts=True,
+        )
+        # bulk_create returns the conflicting rows too, so count what was actually inserted
+        queued = Certificate.objects.filter(pk__gt=last_pk, queued_at=now).count()
+        self.stdout.write(f'Queued {queued} new certificates.')
+
+        queue = Certificate.objects.renderable(settings.CERTIFICATE_RENDER_TIMEOUT)
+        if options['course']:
+            queue = queue.filter(enrollment__course_id=options['course'])
+
+        rendered = failed = 0
+        started = time.perf_counter()
+        connections.close_all()
+        with multiprocessing.Pool(options['processes'], initializer=_init_worker) as pool:
+            while True:
+                batch = self.claim(queue, options['chunk_size'])
+                if not batch:
+                    break
+                claimed = {certificate.pk: certificate for certificate in batch}
+                done, errors = [], {}
+                for pk, name, render_ms, error in pool.imap_unordered(_render, batch, chunksize=8):
+                    if name:
+                        done.append(Certificate(pk=pk, pdf_file=name, status=Certificate.READY,
+                                                rendered_at=timezone.now(), render_ms=render_ms, error='',
+                                                attempts=claimed[pk].attempts + 1))
+                    else:
+                        errors[pk] = error
+                Certificate.objects.bulk_update(done, ['pdf_file', 'status', 'rendered_at', 'render_ms', 'error', 'attempts'])
+                # Same retry budget as certificate_worker: failures go back in the queue until attempts run out
+                for pk, error in errors.items():
+                    record_failure(claimed[pk], error)
+                rendered += len(done)
+                failed += len(errors)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{rendered} rendered, {failed} failed, {rendered / elapsed:.1f} pages/s')
+
+        issued = Enrollment.objects.filter(
+            certificate__status=Certificate.READY, certificate_issued=False
+        ).update(certificate_issued=True)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {rendered} certificates in {elapsed:.1f}s ({rendered / elapsed if elapsed else 0:.1f} pages/s), '
+            f'{failed} failed, {issued} enrollments marked issued.'
+        ))
+
+    def claim(self, queue, size):
+        """Mark the next ``size`` queued certificates as rendering and return them"""
+        ids = list(queue.order_by('queued_at').values_list('pk', flat=True)[:size])
+        if not ids:
+            return []
+        claimed_at = timezone.now()
+        queue.filter(pk__in=ids).update(status=Certificate.RENDERING, render_started_at=claimed_at)
+        return list(
+            Certificate.objects.filter(pk__in=ids, status=Certificate.RENDERING, render_started_at=claimed_at)
+            .select_related('enrollment__student', 'enrollment__course')
+        )
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:07
+
+from django.db import migrations, models
+from django.db.models import F, Q
+
+
+def backfill_status(apps, schema_editor):
+    Certificate = apps.get_model('certificates', 'Certificate')
+    has_pdf = Q(pdf_file__isnull=False) & ~Q(pdf_file='')
+    Certificate.objects.filter(has_pdf).update(status='ready', rendered_at=F('issued_at'))
+    Certificate.objects.exclude(has_pdf).update(status='pending', queued_at=F('issued_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certificates', '0002_initial'),
+        ('courses', '0010_course_thumbnail_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificate',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='render_ms',
+            field=models.PositiveIntegerField(blank=True, help_text='Wall time of the last successful render', null=True),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='render_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='rendered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('rendering', 'Rendering'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(fields=['status', 'queued_at'], name='certificate_queue_idx'),
+        ),
+        migrations.RunPython(backfill_status, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,65 @@
+from datetime import timedelta
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
 import uuid
 from courses.models import Enrollment
 
+class CertificateQuerySet(models.QuerySet):
+    def renderable(self, stale_after):
+        """Certificates waiting to render, including renders abandoned by a dead worker"""
+        return self.filter(
+            Q(status=Certificate.PENDING)
+            | Q(status=Certificate.RENDERING, render_started_at__lt=timezone.now() - timedelta(seconds=stale_after))
+        )
+    
+    def enqueue(self, enrollment):
+        """Get or create the certificate for ``enrollment``, queueing it when there is no PDF yet"""
+        certificate, created = self.get_or_create(
+            enrollment=enrollment, defaults={'status': Certificate.PENDING, 'queued_at': timezone.now()}
+        )
+        if certificate.status == Certificate.FAILED:
+            self.filter(pk=certificate.pk, status=Certificate.FAILED).update(
+                status=Certificate.PENDING, queued_at=timezone.now(), attempts=0, error=''
+            )
+            certificate.status = Certificate.PENDING
+        return certificate
+
 class Certificate(models.Model):
     """Course completion certificates"""
+    PENDING = 'pending'
+    RENDERING = 'rendering'
+    READY = 'ready'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RENDERING, 'Rendering'),
+        (READY, 'Ready'),
+        (FAILED, 'Failed'),
+    ]
+    
     enrollment = models.OneToOneField(Enrollment, on_delete=models.CASCADE)
     certificate_id = models.UUIDField(default=uuid.uuid4, unique=True)
     issued_at = models.DateTimeField(auto_now_add=True)
     pdf_file = models.FileField(upload_to='certificates/', blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    queued_at = models.DateTimeField(blank=True, null=True)
+    render_started_at = models.DateTimeField(blank=True, null=True)
+    rendered_at = models.DateTimeField(blank=True, null=True)
+    render_ms = models.PositiveIntegerField(blank=True, null=True, help_text="Wall time of the last successful render")
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    
+    objects = CertificateQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'queued_at'], name='certificate_queue_idx'),
+        ]
     
     def __str__(self):
-        return f"Certificate - {self.enrollment.student.username} - {self.enrollment.course.title}"
\ No newline at end of file
+        return f"Certificate - {self.enrollment.student.username} - {self.enrollment.course.title}"
+    
+    @property
+    def is_ready(self):
+        return self.status == self.READY and bool(self.pdf_file)
@@ -0,0 +1,148 @@
+"""
+Certificate PDF rendering and the database-backed render queue.
+
+Views only enqueue (Certificate.objects.enqueue); the certificate_worker
+command renders queued certificates in a process pool. render_certificate()
+claims a row with a conditional UPDATE before doing any work, so running it
+twice for the same certificate, or from several workers, renders once.
+"""
+import logging
+import time
+from datetime import timedelta
+from functools import lru_cache
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Avg, Count, Max, Min
+from django.template.loader import get_template
+from django.utils import timezone
+from courses.models import Enrollment
+from .models import Certificate
+from .verification import invalidate_summary
+
+logger = logging.getLogger(__name__)
+
+
+def certificate_context(certificate):
+    return {
+        'student': certificate.enrollment.student,
+        'course': certificate.enrollment.course,
+        'certificate_id': certificate.certificate_id,
+        'issued_at': certificate.issued_at,
+    }
+
+
+class CertificateRenderer:
+    """
+    Holds everything that is the same for every certificate: the compiled
+    template, the parsed stylesheet and the font configuration. Building
+    one is the expensive part; render() then only fills in the per-student
+    fields and lays out the page.
+    """
+    template_name = 'certificates/certificate_template.html'
+    stylesheet_name = 'certificates/certificate.css'
+
+    def __init__(self):
+        # WeasyPrint pulls in Pango/Cairo; only processes that render should pay for that import
+        from weasyprint import CSS, HTML
+        from weasyprint.text.fonts import FontConfiguration
+
+        self._html = HTML
+        self.template = get_template(self.template_name)
+        self.font_config = FontConfiguration()
+        self.stylesheet = CSS(string=get_template(self.stylesheet_name).render(), font_config=self.font_config)
+
+    def render(self, certificate):
+        html_string = self.template.render(certificate_context(certificate))
+        return self._html(string=html_string).write_pdf(stylesheets=[self.stylesheet], font_config=self.font_config)
+
+
+@lru_cache(maxsize=None)
+def get_renderer():
+    """The process-wide renderer, built on first use"""
+    return CertificateRenderer()
+
+
+def render_pdf(certificate):
+    """Render the PDF bytes for ``certificate``"""
+    return get_renderer().render(certificate)
+
+
+def save_pdf(certificate, pdf):
+    """Write the PDF to storage and return its name"""
+    return certificate.pdf_file.storage.save(
+        certificate.pdf_file.field.generate_filename(certificate, f'certificate_{certificate.certificate_id}.pdf'),
+        ContentFile(pdf),
+    )
+
+
+def claim(certificate_id):
+    """Move one queued certificate to RENDERING; False if it is done or another worker has it"""
+    now = timezone.now()
+    return bool(
+        Certificate.objects.renderable(settings.CERTIFICATE_RENDER_TIMEOUT)
+        .filter(pk=certificate_id)
+        .update(status=Certificate.RENDERING, render_started_at=now)
+    )
+
+
+def render_certificate(certificate_id):
+    """Render one queued certificate; returns the render time in ms, or None if there was nothing to do"""
+    if not claim(certificate_id):
+        return None
+    certificate = Certificate.objects.select_related('enrollment__student', 'enrollment__course').get(pk=certificate_id)
+    started = time.perf_counter()
+    try:
+        pdf = render_pdf(certificate)
+    except Exception as exc:
+        logger.exception('Rendering certificate %s failed', certificate.certificate_id)
+        record_failure(certificate, exc)
+        return None
+    render_ms = round((time.perf_counter() - started) * 1000)
+    store(certificate, pdf, render_ms)
+    Enrollment.objects.filter(pk=certificate.enrollment_id).update(certificate_issued=True)
+    return render_ms
+
+
+def record_failure(certificate, error):
+    """Queue a failed render again, or mark it FAILED once CERTIFICATE_MAX_ATTEMPTS renders have failed"""
+    attempts = certificate.attempts + 1
+    Certificate.objects.filter(pk=certificate.pk, status=Certificate.RENDERING).update(
+        status=Certificate.FAILED if attempts >= settings.CERTIFICATE_MAX_ATTEMPTS else Certificate.PENDING,
+        attempts=attempts,
+        error=str(error)[:2000],
+    )
+    invalidate_summary(certificate.certificate_id)
+
+
+def store(certificate, pdf, render_ms):
+    """Save the PDF and mark the certificate ready"""
+    Certificate.objects.filter(pk=certificate.pk).update(
+        pdf_file=save_pdf(certificate, pdf),
+        status=Certificate.READY,
+        rendered_at=timezone.now(),
+        render_ms=render_ms,
+        attempts=certificate.attempts + 1,
+        error='',
+    )
+    invalidate_summary(certificate.certificate_id)
+
+
+def queue_stats():
+    """Queue depth and recent render timings for monitoring"""
+    now = timezone.now()
+    counts = dict(
+        Certificate.objects.exclude(status=Certificate.READY).order_by().values_list('status').annotate(Count('pk'))
+    )
+    oldest = Certificate.objects.filter(status=Certificate.PENDING).aggregate(oldest=Min('queued_at'))['oldest']
+    recent = Certificate.objects.filter(
+        status=Certificate.READY, rendered_at__gte=now - timedelta(hours=1)
+    ).aggregate(rendered=Count('pk'), avg_ms=Avg('render_ms'), max_ms=Max('render_ms'))
+    return {
+        'pending': counts.get(Certificate.PENDING, 0),
+        'rendering': counts.get(Certificate.RENDERING, 0),
+        'failed': counts.get(Certificate.FAILED, 0),
+        'oldest_pending_seconds': round((now - oldest).total_seconds()) if oldest else 0,
+        'rendered_last_hour': recent['rendered'],
+        'avg_render_ms': round(recent['avg_ms'] or 0),
+        'max_render_ms': recent['max_ms'] or 0,
+    }
@@ -5,4 +5,7 @@ app_name = 'certificates'
 
 urlpatterns = [
     path('<int:enrollment_pk>/', views.generate_certificate, name='generate_certificate'),
-]
\ No newline at end of file
+    path('<int:enrollment_pk>/status/', views.certificate_status, name='certificate_status'),
+    path('verify/<uuid:certificate_id>/', views.verify_certificate, name='verify_certificate'),
+    path('queue/stats/', views.render_queue_stats, name='render_queue_stats'),
+]
@@ -0,0 +1,66 @@
+"""
+Public certificate verification.
+
+Summaries are built from a single joined query and cached by certificate
+ID, so verification traffic never reads certificate PDFs and rarely reaches
+the database. Unknown IDs are cached briefly as well, so guessing IDs is
+cheap for us, and so are certificates that are still rendering or have
+failed. Profile or course renames show up when the entry expires.
+"""
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import cache
+from .models import Certificate
+
+MISSING = 'missing'
+
+
+def _cache_key(certificate_id):
+    return f'certificates:verify:{certificate_id}'
+
+
+def build_summary(certificate_id):
+    certificate = (
+        Certificate.objects.select_related('enrollment__student', 'enrollment__course__instructor')
+        .filter(certificate_id=certificate_id)
+        .first()
+    )
+    if certificate is None:
+        return None
+    student = certificate.enrollment.student
+    course = certificate.enrollment.course
+    return {
+        'certificate_id': str(certificate.certificate_id),
+        # Only a rendered certificate has been issued; queued or failed ones exist but are not valid yet
+        'valid': certificate.status == Certificate.READY,
+        'status': certificate.status,
+        'student': student.get_full_name() or student.username,
+        'course': course.title,
+        'instructor': course.instructor.get_full_name() or course.instructor.username,
+        'issued_at': certificate.issued_at.isoformat(),
+    }
+
+
+def summary_timeout(summary):
+    """Valid summaries are stable; missing and not-yet-valid ones may change soon, so they expire quickly"""
+    if summary and summary['valid']:
+        return settings.CERTIFICATE_VERIFY_TIMEOUT
+    return settings.CERTIFICATE_VERIFY_MISSING_TIMEOUT
+
+
+def get_summary(certificate_id):
+    """Return (summary or None, etag) for ``certificate_id``"""
+    key = _cache_key(certificate_id)
+    cached = cache.get(key)
+    if cached is None:
+        summary = build_summary(certificate_id)
+        payload = json.dumps(summary, sort_keys=True)
+        cached = (summary or MISSING, hashlib.sha256(payload.encode()).hexdigest()[:32])
+        cache.set(key, cached, summary_timeout(summary))
+    summary, etag = cached
+    return (None if summary == MISSING else summary), etag
+
+
+def invalidate_summary(certificate_id):
+    cache.delete(_cache_key(certificate_id))
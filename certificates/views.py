@@ -1,12 +1,14 @@
-from django.shortcuts import render, get_object_or_404
-from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse
+from django.conf import settings
+from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
 from django.contrib import messages
-from django.template.loader import render_to_string
-from weasyprint import HTML
-from django.core.files.base import ContentFile
 from .models import Certificate
+from .rendering import queue_stats
+from .verification import get_summary, summary_timeout
 from courses.models import Enrollment
+from django_elms.streaming import serve_file
 
 @login_required
 def generate_certificate(request, enrollment_pk):
@@ -15,18 +17,55 @@ def generate_certificate(request, enrollment_pk):
         messages.error(request, 'You must complete the course to generate a certificate.')
         return redirect('courses:course_learn', pk=enrollment.course.pk)
     
-    certificate, created = Certificate.objects.get_or_create(enrollment=enrollment)
-    if created:
-        html_string = render_to_string('certificates/certificate_template.html', {
-            'student': enrollment.student,
-            'course': enrollment.course,
-            'certificate_id': certificate.certificate_id,
-            'issued_at': certificate.issued_at,
+    # Rendering happens in the certificate_worker pool; until then show a page that polls for it
+    certificate = Certificate.objects.enqueue(enrollment)
+    if not certificate.is_ready:
+        return render(request, 'certificates/certificate_status.html', {
+            'enrollment': enrollment,
+            'certificate': certificate,
+            'poll_seconds': settings.CERTIFICATE_STATUS_POLL_SECONDS,
         })
-        pdf_file = HTML(string=html_string).write_pdf()
-        certificate.pdf_file.save(f'certificate_{certificate.certificate_id}.pdf', ContentFile(pdf_file))
-        certificate.save()
-        enrollment.certificate_issued = True
-        enrollment.save()
     
-    return HttpResponse(certificate.pdf_file, content_type='application/pdf')
\ No newline at end of file
+    # A certificate's PDF never changes once rendered, so its ID is a stable validator
+    return serve_file(
+        request, certificate.pdf_file, etag=str(certificate.certificate_id),
+        filename=f'certificate_{certificate.certificate_id}.pdf', content_type='application/pdf',
+    )
+
+@login_required
+def certificate_status(request, enrollment_pk):
+    certificate = get_object_or_404(
+        Certificate, enrollment__pk=enrollment_pk, enrollment__student=request.user
+    )
+    return JsonResponse({'success': True, 'status': certificate.status})
+
+@user_passes_test(lambda user: user.is_staff)
+def render_queue_stats(request):
+    return JsonResponse(queue_stats())
+
+def verify_certificate(request, certificate_id):
+    """Public, read-only check that a certificate ID was issued; HTML by default, JSON on request"""
+    summary, etag = get_summary(certificate_id)
+    wants_json = request.GET.get('format') == 'json' or (
+        request.accepts('application/json') and not request.accepts('text/html')
+    )
+    etag = f'"{etag}-json"' if wants_json else f'"{etag}"'
+    
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        status = 200 if summary else 404
+        if wants_json:
+            data = {'success': True, 'certificate': summary} if summary else {'success': False, 'error': 'Certificate not found'}
+            response = JsonResponse(data, status=status)
+        else:
+            response = render(request, 'certificates/verify.html', {'summary': summary, 'certificate_id': certificate_id}, status=status)
+    
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Accept'])
+    # The HTML page carries the signed-in user's navigation, so only anonymous and JSON responses are shareable
+    visibility = 'public' if wants_json or not request.user.is_authenticated else 'private'
+    patch_cache_control(
+        response, **{visibility: True},
+        max_age=summary_timeout(summary),
+    )
+    return response
@@ -1,5 +1,10 @@
+import io
 from django.contrib import admin
-from .models import Category, Course, Module, Lesson, Enrollment, LessonProgress, Review
+from django.contrib.admin import helpers
+from django.shortcuts import render
+from .enrollment_import import EnrollmentImporter, guess_format, read_rows
+from .forms import EnrollmentImportForm
+from .models import Category, Course, Module, Lesson, Enrollment, LessonProgress, Review, SeatReservation
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -10,12 +15,43 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
-    list_display = ['title', 'instructor', 'category', 'status', 'level', 'price', 'created_at']
+    list_display = ['title', 'instructor', 'category', 'status', 'level', 'price', 'lesson_count', 'created_at']
     list_filter = ['status', 'category', 'level', 'created_at']
     search_fields = ['title', 'description', 'instructor__username']
     list_editable = ['status']
     raw_id_fields = ['instructor', 'category']
     date_hierarchy = 'created_at'
+    readonly_fields = ['lesson_count', 'total_duration_minutes', 'rating_count', 'rating_average', 'seats_taken']
+    actions = ['recompute_totals', 'import_enrollments']
+    
+    @admin.action(description='Recompute lesson totals')
+    def recompute_totals(self, request, queryset):
+        updated = queryset.refresh_totals()
+        Enrollment.objects.filter(course__in=queryset).shift_progress()
+        self.message_user(request, f'Recomputed totals for {updated} courses.')
+    
+    @admin.action(description='Import enrollments from file')
+    def import_enrollments(self, request, queryset):
+        form = EnrollmentImportForm(request.POST, request.FILES) if 'apply' in request.POST else EnrollmentImportForm()
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            importer = EnrollmentImporter(dry_run=form.cleaned_data['dry_run'], notify=form.cleaned_data['notify'])
+            try:
+                rows = read_rows(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''), guess_format(upload.name))
+                result = importer.run(rows, default_courses=list(queryset.values_list('pk', flat=True)))
+            except ValueError as exc:
+                form.add_error('file', str(exc))
+            else:
+                self.message_user(request, result.summary())
+                return None
+        return render(request, 'admin/courses/course/import_enrollments.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Import enrollments',
+            'opts': self.model._meta,
+            'form': form,
+            'courses': queryset,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
 
 @admin.register(Module)
 class ModuleAdmin(admin.ModelAdmin):
@@ -52,4 +88,11 @@ class ReviewAdmin(admin.ModelAdmin):
     list_display = ['course', 'student', 'rating', 'created_at']
     list_filter = ['rating', 'created_at', 'course']
     search_fields = ['course__title', 'student__username', 'review_text']
-    raw_id_fields = ['course', 'student']
\ No newline at end of file
+    raw_id_fields = ['course', 'student']
+
+@admin.register(SeatReservation)
+class SeatReservationAdmin(admin.ModelAdmin):
+    list_display = ['course', 'student', 'expires_at', 'created_at']
+    list_filter = ['expires_at', 'course']
+    search_fields = ['course__title', 'student__username']
+    raw_id_fields = ['course', 'student']
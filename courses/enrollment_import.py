@@ -0,0 +1,268 @@
+"""
+Cohort enrollment import shared by the import_enrollments command and the
+course admin action.
+
+Input rows name a user (username or email) and optionally a course UUID;
+rows without a course are enrolled in the default courses passed to run().
+Rows are processed in chunks: users, courses and existing enrollments are
+resolved with one set-based query each, and enrollments and notifications
+are written with bulk_create.
+"""
+import csv
+import json
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from users.models import Notification, User
+from .models import Course, Enrollment, Lesson, SeatReservation, seats_handled
+
+USER_COLUMNS = ('user', 'username', 'email')
+COURSE_COLUMNS = ('course', 'course_id')
+
+
+def _json_records(fileobj):
+    for line in fileobj:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def read_rows(fileobj, fmt):
+    """
+    Yield (user reference, course id or None) from a CSV or JSONL text
+    stream, or None for a row that cannot be read (malformed JSON, or a
+    JSONL value that is not an object).
+    """
+    if fmt == 'jsonl':
+        records = _json_records(fileobj)
+    elif fmt == 'csv':
+        records = csv.DictReader(fileobj)
+    else:
+        raise ValueError(f'Unsupported format: {fmt}')
+    for record in records:
+        if not isinstance(record, dict):
+            yield None
+            continue
+        user = next((str(record[key]).strip() for key in USER_COLUMNS if record.get(key)), '')
+        course = next((str(record[key]).strip() for key in COURSE_COLUMNS if record.get(key)), None)
+        yield user, course
+
+
+def guess_format(filename):
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    enrolled: int = 0
+    existing: int = 0
+    duplicates: int = 0
+    unknown_users: int = 0
+    unknown_courses: int = 0
+    full: int = 0
+    invalid: int = 0
+    elapsed: float = 0.0
+    dry_run: bool = False
+
+    @property
+    def rate(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        verb = 'would enroll' if self.dry_run else 'enrolled'
+        return (
+            f'{self.rows} rows in {self.elapsed:.2f}s ({self.rate:.0f} rows/s): {verb} {self.enrolled}, '
+            f'already enrolled {self.existing}, duplicate rows {self.duplicates}, unknown users {self.unknown_users}, '
+            f'unknown courses {self.unknown_courses}, no seat left {self.full}, invalid rows {self.invalid}'
+        )
+
+
+class EnrollmentImporter:
+    def __init__(self, batch_size=1000, dry_run=False, notify=True):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.notify = notify
+        self._courses = {}
+        self._first_lessons = {}
+        self._seen = set()
+        self._dry_claimed = {}
+
+    def run(self, rows, default_courses=()):
+        result = ImportResult(dry_run=self.dry_run)
+        started = time.perf_counter()
+        chunk = []
+        for row in rows:
+            if row is None:
+                result.rows += 1
+                result.invalid += 1
+                continue
+            user, course = row
+            chunk.extend((user, course_id) for course_id in ([course] if course else default_courses or [None]))
+            result.rows += 1
+            if len(chunk) >= self.batch_size:
+                self._import_chunk(chunk, result)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk, result)
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def _import_chunk(self, chunk, result):
+        users = self._resolve_users({user for user, _ in chunk if user})
+        self._load_courses({course for _, course in chunk if course})
+
+        pairs = []
+        for user, course in chunk:
+            course_id = self._course_id(course)
+            if user not in users:
+                result.unknown_users += 1
+            elif course_id not in self._courses:
+                result.unknown_courses += 1
+            elif (users[user], course_id) in self._seen:
+                result.duplicates += 1
+            else:
+                self._seen.add((users[user], course_id))
+                pairs.append((users[user], course_id))
+        if not pairs:
+            return
+
+        existing = set(Enrollment.objects.filter(
+            student_id__in={student for student, _ in pairs},
+            course_id__in={course for _, course in pairs},
+        ).values_list('student_id', 'course_id'))
+        new_pairs = [pair for pair in pairs if pair not in existing]
+        result.existing += len(pairs) - len(new_pairs)
+
+        by_course = {}
+        for student_id, course_id in new_pairs:
+            by_course.setdefault(course_id, []).append(student_id)
+
+        with transaction.atomic():
+            enrollments = []
+            for course_id, student_ids in by_course.items():
+                course = self._courses[course_id]
+                held = self._consume_reservations(course_id, student_ids)
+                student_ids = list(held) + [student_id for student_id in student_ids if student_id not in held]
+                granted = len(held) + self._claim(course, len(student_ids) - len(held))
+                result.full += len(student_ids) - granted
+                for student_id in student_ids[:granted]:
+                    enrollments.append(Enrollment(
+                        student_id=student_id, course_id=course_id, next_lesson_id=self._first_lesson(course_id)
+                    ))
+            if not self.dry_run:
+                inserted = self._insert(enrollments)
+                result.existing += len(enrollments) - len(inserted)
+                enrollments = inserted
+                if self.notify:
+                    Notification.objects.bulk_create([
+                        Notification(
+                            user_id=enrollment.student_id,
+                            notification_type='enrollment',
+                            title='Successfully Enrolled',
+                            message=f'You have been enrolled in "{self._courses[enrollment.course_id].title}"',
+                        )
+                        for enrollment in enrollments
+                    ], batch_size=self.batch_size)
+            result.enrolled += len(enrollments)
+
+    def _insert(self, enrollments):
+        """
+        bulk_create ``enrollments``, dropping any a concurrent enroll() got to
+        first and handing back the seats claimed for them; returns the rows
+        actually inserted.
+        """
+        while enrollments:
+            try:
+                with transaction.atomic():
+                    Enrollment.objects.bulk_create(enrollments, batch_size=self.batch_size)
+                return enrollments
+            except IntegrityError:
+                taken = set(Enrollment.objects.filter(
+                    student_id__in={enrollment.student_id for enrollment in enrollments},
+                    course_id__in={enrollment.course_id for enrollment in enrollments},
+                ).values_list('student_id', 'course_id'))
+                lost = Counter(
+                    enrollment.course_id for enrollment in enrollments
+                    if (enrollment.student_id, enrollment.course_id) in taken
+                )
+                if not lost:
+                    raise
+                for course_id, count in lost.items():
+                    Course(pk=course_id).release_seats(count)
+                enrollments = [
+                    enrollment for enrollment in enrollments
+                    if (enrollment.student_id, enrollment.course_id) not in taken
+                ]
+        return enrollments
+
+    def _consume_reservations(self, course_id, student_ids):
+        """Students already holding a seat reservation keep that seat instead of claiming another"""
+        reservations = SeatReservation.objects.filter(
+            course_id=course_id, student_id__in=student_ids, expires_at__gt=timezone.now()
+        )
+        if self.dry_run:
+            return set(reservations.values_list('student_id', flat=True))
+        # Lock the holds so the expiry sweep cannot release a seat we are converting into an enrollment
+        held = set(reservations.select_for_update().values_list('student_id', flat=True))
+        if held:
+            seats_handled(SeatReservation.objects.filter(course_id=course_id, student_id__in=held)).delete()
+        return held
+
+    def _claim(self, course, wanted):
+        """Claim up to ``wanted`` seats; returns how many were granted"""
+        if wanted == 0:
+            return 0
+        if course.max_students is None:
+            if not self.dry_run:
+                course.claim_seats(wanted)
+            return wanted
+        while True:
+            taken = Course.objects.values_list('seats_taken', flat=True).get(pk=course.pk)
+            taken += self._dry_claimed.get(course.pk, 0)
+            granted = min(wanted, max(course.max_students - taken, 0))
+            if self.dry_run:
+                self._dry_claimed[course.pk] = self._dry_claimed.get(course.pk, 0) + granted
+                return granted
+            if granted == 0 or course.claim_seats(granted):
+                return granted
+
+    def _resolve_users(self, refs):
+        resolved = {}
+        for pk, username, email in User.objects.filter(
+            Q(username__in=refs) | Q(email__in=refs)
+        ).values_list('pk', 'username', 'email'):
+            resolved[username] = pk
+            if email in refs:
+                resolved.setdefault(email, pk)
+        return resolved
+
+    def _load_courses(self, refs):
+        wanted = {self._course_id(ref) for ref in refs} - set(self._courses) - {None}
+        if wanted:
+            self._courses.update(Course.objects.only('pk', 'title', 'max_students').in_bulk(wanted))
+
+    def _course_id(self, ref):
+        if isinstance(ref, uuid.UUID) or ref is None:
+            return ref
+        try:
+            return uuid.UUID(str(ref))
+        except ValueError:
+            return None
+
+    def _first_lesson(self, course_id):
+        if course_id not in self._first_lessons:
+            self._first_lessons[course_id] = (
+                Lesson.objects.filter(module__course=course_id)
+                .order_by('module__order', 'order')
+                .values_list('pk', flat=True)
+                .first()
+            )
+        return self._first_lessons[course_id]
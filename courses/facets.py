@@ -0,0 +1,67 @@
+"""Facet counts for the catalog sidebar"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, Q, Value, When
+
+FACETS_CACHE_KEY = 'courses:catalog_facets'
+
+PRICE_BANDS = [
+    ('free', 'Free', Q(price=0)),
+    ('under_50', 'Under $50', Q(price__gt=0, price__lt=50)),
+    ('50_100', '$50 - $100', Q(price__gte=50, price__lte=100)),
+    ('over_100', 'Over $100', Q(price__gt=100)),
+]
+
+
+def price_band_filter(band):
+    for key, label, condition in PRICE_BANDS:
+        if key == band:
+            return condition
+    return None
+
+
+def category_counts(queryset):
+    return dict(queryset.order_by().values_list('category__slug').annotate(Count('pk')))
+
+
+def level_counts(queryset):
+    return dict(queryset.order_by().values_list('level').annotate(Count('pk')))
+
+
+def price_band_counts(queryset):
+    band = Case(
+        *[When(condition, then=Value(key)) for key, label, condition in PRICE_BANDS],
+        output_field=CharField(),
+    )
+    return dict(queryset.order_by().annotate(band=band).values_list('band').annotate(Count('pk')))
+
+
+FACETS = {
+    'category': category_counts,
+    'level': level_counts,
+    'price': price_band_counts,
+}
+
+
+def compute_facets(queryset_for):
+    """
+    Count courses per facet value, one grouped query per facet.
+
+    ``queryset_for(name)`` returns the catalog queryset with every active
+    filter applied except facet ``name``'s own, so each facet shows how many
+    results picking one of its values would give.
+    """
+    return {name: counter(queryset_for(name)) for name, counter in FACETS.items()}
+
+
+def cached_facets(queryset):
+    """Facets for the unfiltered catalog; dropped by courses.signals when a course moves"""
+    facets = cache.get(FACETS_CACHE_KEY)
+    if facets is None:
+        facets = compute_facets(lambda name: queryset)
+        cache.set(FACETS_CACHE_KEY, facets, settings.CATALOG_FACETS_TIMEOUT)
+    return facets
+
+
+def invalidate_facets():
+    cache.delete(FACETS_CACHE_KEY)
@@ -37,4 +37,9 @@ class ReviewForm(forms.ModelForm):
         widgets = {
             'rating': forms.Select(choices=[(i, f'{i} Star{"s" if i != 1 else ""}') for i in range(1, 6)]),
             'review_text': forms.Textarea(attrs={'rows': 4}),
-        }
\ No newline at end of file
+        }
+
+class EnrollmentImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV with a user (username or email) column and optional course column, or JSONL with the same keys")
+    dry_run = forms.BooleanField(required=False, help_text="Only report what would be enrolled")
+    notify = forms.BooleanField(required=False, initial=True, help_text="Send enrollment notifications")
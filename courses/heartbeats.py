@@ -0,0 +1,170 @@
+"""
+Buffered time-on-lesson heartbeats.
+
+The lesson player pings every LESSON_HEARTBEAT_INTERVAL seconds. Pings are
+summed per (enrollment, lesson) in process memory and written to
+``LessonProgress.time_spent_minutes`` in bulk by a background flusher, when
+the buffer fills up, and at interpreter exit. Seconds that do not yet add up
+to a whole minute are carried to the next flush; if no further pings arrive
+they are rounded to the nearest minute and written.
+"""
+import atexit
+import logging
+import threading
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Case, F, Q, When
+from .models import LessonProgress
+
+logger = logging.getLogger(__name__)
+
+UPDATE_CHUNK_SIZE = 200
+
+
+def write_time_spent(minutes_by_key):
+    """Add minutes to LessonProgress rows keyed by (enrollment_id, lesson_id)"""
+    items = list(minutes_by_key.items())
+    with transaction.atomic():
+        LessonProgress.objects.bulk_create(
+            [LessonProgress(enrollment_id=enrollment_id, lesson_id=lesson_id) for enrollment_id, lesson_id in minutes_by_key],
+            ignore_conflicts=True,
+        )
+        for start in range(0, len(items), UPDATE_CHUNK_SIZE):
+            condition = Q()
+            whens = []
+            for (enrollment_id, lesson_id), minutes in items[start:start + UPDATE_CHUNK_SIZE]:
+                match = Q(enrollment_id=enrollment_id, lesson_id=lesson_id)
+                condition |= match
+                whens.append(When(match, then=F('time_spent_minutes') + minutes))
+            LessonProgress.objects.filter(condition).update(
+                time_spent_minutes=Case(*whens, default=F('time_spent_minutes'))
+            )
+
+
+class HeartbeatBuffer:
+    def __init__(self, max_entries, flush_interval, writer=write_time_spent):
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.writer = writer
+        self.received_events = 0
+        self.flushed_events = 0
+        self.dropped_events = 0
+        self.flushes = 0
+        self._pending = {}
+        self._pending_events = 0
+        # Sub-minute remainders from earlier flushes, key -> (seconds, flushes since last ping).
+        # They are kept out of _pending so they never count against max_entries.
+        self._carry = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher = None
+
+    def add(self, enrollment_id, lesson_id, seconds):
+        """Record a ping; returns False if it was dropped because the buffer is full"""
+        key = (enrollment_id, lesson_id)
+        with self._lock:
+            if key not in self._pending and len(self._pending) >= self.max_entries:
+                self.dropped_events += 1
+                self._wake.set()
+                return False
+            self._pending[key] = self._pending.get(key, 0) + seconds
+            self._pending_events += 1
+            self.received_events += 1
+            full = len(self._pending) >= self.max_entries
+        self._ensure_flusher()
+        if full:
+            # Flush on the flusher thread rather than in the request
+            self._wake.set()
+        return True
+
+    def flush(self, final=False):
+        """
+        Write whole minutes to the database; returns the number of rows
+        touched. Remainders that see no new pings for a flush are written
+        rounded to the nearest minute, as are all remainders when ``final``.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                events, self._pending_events = self._pending_events, 0
+                carry, self._carry = self._carry, {}
+            minutes = {}
+            for key, seconds in pending.items():
+                seconds += carry.pop(key, (0, 0))[0]
+                if seconds >= 60:
+                    minutes[key] = seconds // 60
+                if seconds % 60:
+                    carry[key] = (seconds % 60, 0)
+            for key, (seconds, idle) in list(carry.items()):
+                if final or idle >= 1:
+                    del carry[key]
+                    if seconds >= 30:
+                        minutes[key] = minutes.get(key, 0) + 1
+                else:
+                    carry[key] = (seconds, idle + 1)
+            with self._lock:
+                for key, (seconds, idle) in carry.items():
+                    if key in self._pending:
+                        # Pinged again while the flush was running
+                        self._pending[key] += seconds
+                    else:
+                        self._carry[key] = (seconds, idle)
+            if not minutes:
+                with self._lock:
+                    self.flushed_events += events
+                return 0
+            try:
+                self.writer(minutes)
+            except DatabaseError:
+                logger.exception('Dropping %d buffered heartbeat events', events)
+                with self._lock:
+                    self.dropped_events += events
+                return 0
+            with self._lock:
+                self.flushed_events += events
+                self.flushes += 1
+            return len(minutes)
+
+    def close(self):
+        """Write everything left, including sub-minute remainders; registered with atexit"""
+        return self.flush(final=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending_keys': len(self._pending),
+                'pending_events': self._pending_events,
+                'carried_keys': len(self._carry),
+                'received_events': self.received_events,
+                'flushed_events': self.flushed_events,
+                'dropped_events': self.dropped_events,
+                'flushes': self.flushes,
+            }
+
+    def _ensure_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run_flusher, name='heartbeat-flusher', daemon=True)
+                self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Keep the thread alive; the next interval tries again
+                logger.exception('Heartbeat flush failed')
+            finally:
+                connections.close_all()
+
+
+heartbeat_buffer = HeartbeatBuffer(
+    max_entries=settings.LESSON_HEARTBEAT_MAX_ENTRIES,
+    flush_interval=settings.LESSON_HEARTBEAT_FLUSH_INTERVAL,
+)
+atexit.register(heartbeat_buffer.close)
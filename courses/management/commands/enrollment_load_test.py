@@ -0,0 +1,75 @@
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, OperationalError, connections
+from courses.models import Category, Course, CourseFull, Enrollment
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire concurrent enrollments at a throwaway capped course and verify it is never '
+        'oversubscribed. Everything the test creates is deleted afterwards unless --keep is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=300)
+        parser.add_argument('--capacity', type=int, default=50)
+        parser.add_argument('--workers', type=int, default=32)
+        parser.add_argument('--retries', type=int, default=5, help='Retries per student on lock timeouts')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated course and users')
+
+    def handle(self, *args, **options):
+        if options['capacity'] < 1 or options['students'] < 1 or options['workers'] < 1:
+            raise CommandError('--students, --capacity and --workers must be positive')
+
+        tag = uuid.uuid4().hex[:8]
+        instructor = User.objects.create(username=f'loadtest-{tag}-instructor', role='instructor')
+        category, _ = Category.objects.get_or_create(slug='load-test', defaults={'name': 'Load Test'})
+        course = Course.objects.create(
+            title=f'Load test {tag}', description='Generated by enrollment_load_test',
+            category=category, instructor=instructor, status='published', max_students=options['capacity'],
+        )
+        User.objects.bulk_create(
+            User(username=f'loadtest-{tag}-{index}') for index in range(options['students'])
+        )
+        students = list(User.objects.filter(username__startswith=f'loadtest-{tag}-').exclude(pk=instructor.pk))
+
+        def attempt(student):
+            try:
+                for _ in range(options['retries'] + 1):
+                    try:
+                        Enrollment.objects.enroll(student, course)
+                        return 'enrolled'
+                    except CourseFull:
+                        return 'full'
+                    except IntegrityError:
+                        return 'duplicate'
+                    except OperationalError:
+                        time.sleep(0.01)
+                return 'error'
+            finally:
+                connections.close_all()
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                outcomes = Counter(pool.map(attempt, students))
+            elapsed = time.perf_counter() - started
+
+            course.refresh_from_db()
+            enrolled = Enrollment.objects.filter(course=course).count()
+            self.stdout.write(
+                f"{len(students)} attempts in {elapsed:.2f}s ({len(students) / elapsed:.0f}/s): "
+                + ', '.join(f'{outcome}={count}' for outcome, count in sorted(outcomes.items()))
+            )
+            self.stdout.write(f'capacity={course.max_students} seats_taken={course.seats_taken} enrollments={enrolled}')
+            if enrolled > course.max_students or course.seats_taken != enrolled:
+                raise CommandError('Seat counter drifted or the course was oversubscribed')
+            self.stdout.write(self.style.SUCCESS('No oversubscription.'))
+        finally:
+            if not options['keep']:
+                course.delete()
+                User.objects.filter(username__startswith=f'loadtest-{tag}-').delete()
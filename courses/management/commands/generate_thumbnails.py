@@ -0,0 +1,41 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from courses.models import Course
+from courses.thumbnails import generate_course_thumbnails
+
+
+def _generate(course_id, force):
+    try:
+        return generate_course_thumbnails(course_id, force=force)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Generate responsive thumbnail variants for existing courses in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2,
+                            help='Pillow releases the GIL while resizing and encoding, so threads scale')
+        parser.add_argument('--force', action='store_true', help='Regenerate even when variants are up to date')
+
+    def handle(self, *args, **options):
+        courses = Course.objects.exclude(thumbnail='').exclude(thumbnail__isnull=True)
+        course_ids = list(courses.values_list('pk', flat=True))
+        started = time.perf_counter()
+        generated = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {executor.submit(_generate, pk, options['force']): pk for pk in course_ids}
+            for future in as_completed(futures):
+                try:
+                    generated += bool(future.result())
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{futures[future]}: {exc}')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(course_ids)} courses checked in {elapsed:.1f}s: {generated} generated, {failed} failed.'
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from courses.enrollment_import import EnrollmentImporter, guess_format, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk enroll a cohort from a CSV or JSONL file of usernames/emails and course IDs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV with a user/username/email column and an optional course column, or JSONL with the same keys')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Input format; guessed from the file extension by default')
+        parser.add_argument('--course', action='append', default=[], help='Course ID for rows without one; may be repeated')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Resolve and count without writing anything')
+        parser.add_argument('--no-notify', action='store_true', help='Skip the enrollment notifications')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or guess_format(options['path'])
+        importer = EnrollmentImporter(
+            batch_size=options['batch_size'], dry_run=options['dry_run'], notify=not options['no_notify'],
+        )
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as fileobj:
+                result = importer.run(read_rows(fileobj, fmt), default_courses=options['course'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+        self.stdout.write(self.style.SUCCESS(result.summary()))
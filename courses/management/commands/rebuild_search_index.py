@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from courses.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the course full-text search index from the Course table'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        indexed = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} courses with {type(backend).__name__}.'))
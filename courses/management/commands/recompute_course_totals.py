@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+from courses.models import Course, Lesson
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored lesson counts and durations for every course from one aggregate query'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing')
+
+    def handle(self, *args, **options):
+        totals = {
+            course_id: (lessons, duration or 0)
+            for course_id, lessons, duration in Lesson.objects.order_by()
+            .values_list('module__course')
+            .annotate(Count('pk'), Sum('duration_minutes'))
+        }
+
+        drifted = []
+        courses = Course.objects.order_by().only('pk', 'lesson_count', 'total_duration_minutes')
+        for course in courses.iterator(chunk_size=options['batch_size']):
+            lessons, duration = totals.get(course.pk, (0, 0))
+            if (course.lesson_count, course.total_duration_minutes) != (lessons, duration):
+                course.lesson_count = lessons
+                course.total_duration_minutes = duration
+                drifted.append(course)
+
+        if drifted and not options['dry_run']:
+            Course.objects.bulk_update(
+                drifted, ['lesson_count', 'total_duration_minutes'], batch_size=options['batch_size']
+            )
+
+        verb = 'would update' if options['dry_run'] else 'updated'
+        self.stdout.write(self.style.SUCCESS(f'{len(drifted)} courses {verb}.'))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+from courses.models import Enrollment, Lesson
+
+
+class Command(BaseCommand):
+    help = 'Recount completed lessons for every enrollment and repair drifted progress counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', help='Only reconcile enrollments of this course (UUID)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive')
+
+        lessons = Lesson.objects.order_by()
+        enrollments = Enrollment.objects.order_by()
+        if options['course']:
+            lessons = lessons.filter(module__course=options['course'])
+            enrollments = enrollments.filter(course=options['course'])
+
+        totals = dict(lessons.values_list('module__course').annotate(Count('pk')))
+        enrollments = enrollments.annotate(
+            actual=Count('lessonprogress', filter=Q(lessonprogress__completed=True))
+        ).only('pk', 'course_id', 'lessons_completed', 'progress_percentage')
+
+        checked = repaired = 0
+        pending = []
+        for enrollment in enrollments.iterator(chunk_size=batch_size):
+            checked += 1
+            total = totals.get(enrollment.course_id, 0)
+            percentage = min(enrollment.actual / total * 100, 100.0) if total else 0.0
+            if enrollment.lessons_completed == enrollment.actual and abs(enrollment.progress_percentage - percentage) < 1e-9:
+                continue
+            enrollment.lessons_completed = enrollment.actual
+            enrollment.progress_percentage = percentage
+            pending.append(enrollment)
+            if len(pending) >= batch_size:
+                repaired += self._flush(pending, options['dry_run'])
+        repaired += self._flush(pending, options['dry_run'])
+
+        verb = 'would repair' if options['dry_run'] else 'repaired'
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} enrollments, {verb} {repaired}.'))
+
+    def _flush(self, pending, dry_run):
+        count = len(pending)
+        if count and not dry_run:
+            Enrollment.objects.bulk_update(pending, ['lessons_completed', 'progress_percentage'])
+        pending.clear()
+        return count
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+from courses.models import Course, Enrollment, SeatReservation
+
+
+class Command(BaseCommand):
+    help = 'Release expired seat reservations and optionally recount every seat counter'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recount', action='store_true',
+            help='Also reset seats_taken to enrollments plus unexpired reservations',
+        )
+
+    def handle(self, *args, **options):
+        released = SeatReservation.objects.release_expired()
+        self.stdout.write(f'Released {released} expired reservations.')
+        if not options['recount']:
+            return
+
+        seats = dict(Enrollment.objects.order_by().values_list('course').annotate(Count('pk')))
+        held = SeatReservation.objects.filter(expires_at__gt=timezone.now()).order_by().values_list('course').annotate(Count('pk'))
+        for course_id, count in held:
+            seats[course_id] = seats.get(course_id, 0) + count
+
+        drifted = []
+        for course in Course.objects.order_by().only('pk', 'seats_taken').iterator():
+            if course.seats_taken != seats.get(course.pk, 0):
+                course.seats_taken = seats.get(course.pk, 0)
+                drifted.append(course)
+        Course.objects.bulk_update(drifted, ['seats_taken'], batch_size=500)
+        self.stdout.write(self.style.SUCCESS(f'Recounted seats, {len(drifted)} courses corrected.'))
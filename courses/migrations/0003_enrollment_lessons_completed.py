@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:52
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_lessons_completed(apps, schema_editor):
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    Lesson = apps.get_model('courses', 'Lesson')
+    totals = dict(Lesson.objects.order_by().values_list('module__course').annotate(Count('pk')))
+    enrollments = Enrollment.objects.annotate(
+        actual=Count('lessonprogress', filter=Q(lessonprogress__completed=True))
+    )
+    updated = []
+    for enrollment in enrollments.iterator(chunk_size=1000):
+        total = totals.get(enrollment.course_id, 0)
+        enrollment.lessons_completed = enrollment.actual
+        enrollment.progress_percentage = min(enrollment.actual / total * 100, 100.0) if total else 0.0
+        updated.append(enrollment)
+    Enrollment.objects.bulk_update(updated, ['lessons_completed', 'progress_percentage'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='lessons_completed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_lessons_completed, migrations.RunPython.noop),
+    ]
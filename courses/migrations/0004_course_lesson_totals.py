@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:53
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_course_totals(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Lesson = apps.get_model('courses', 'Lesson')
+    totals = Lesson.objects.order_by().values_list('module__course').annotate(Count('pk'), Sum('duration_minutes'))
+    for course_id, lessons, duration in totals:
+        Course.objects.filter(pk=course_id).update(lesson_count=lessons, total_duration_minutes=duration or 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_enrollment_lessons_completed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lesson_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='total_duration_minutes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_course_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS courses_course_fts USING fts5('
+        'course_id UNINDEXED, title, description, instructor, '
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        'INSERT INTO courses_course_fts (course_id, title, description, instructor) '
+        'SELECT c.id, c.title, c.description, u.username '
+        'FROM courses_course c JOIN users_user u ON u.id = c.instructor_id'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS courses_course_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_course_rating_summary'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:58
+
+import django.db.models.deletion
+from collections import defaultdict
+from django.db import migrations, models
+
+
+def backfill_next_lesson(apps, schema_editor):
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    Lesson = apps.get_model('courses', 'Lesson')
+    LessonProgress = apps.get_model('courses', 'LessonProgress')
+    outlines = defaultdict(list)
+    for lesson_id, course_id in Lesson.objects.order_by('module__order', 'order').values_list('pk', 'module__course'):
+        outlines[course_id].append(lesson_id)
+    completed = defaultdict(set)
+    for enrollment_id, lesson_id in LessonProgress.objects.filter(completed=True).values_list('enrollment_id', 'lesson_id'):
+        completed[enrollment_id].add(lesson_id)
+    updated = []
+    for enrollment in Enrollment.objects.only('pk', 'course_id').iterator(chunk_size=1000):
+        done = completed[enrollment.pk]
+        enrollment.next_lesson_id = next((pk for pk in outlines[enrollment.course_id] if pk not in done), None)
+        updated.append(enrollment)
+    Enrollment.objects.bulk_update(updated, ['next_lesson'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_course_outline_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='last_accessed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='last_accessed_lesson',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.lesson'),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='next_lesson',
+            field=models.ForeignKey(blank=True, help_text='First incomplete lesson in outline order; null once everything is done', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.lesson'),
+        ),
+        migrations.RunPython(backfill_next_lesson, migrations.RunPython.noop),
+    ]
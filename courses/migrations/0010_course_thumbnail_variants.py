@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_seat_counter_and_reservations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='thumbnail_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized thumbnail files by format and width'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:31
+
+import django_elms.storage
+from django.core.files.storage import storages
+from django.db import migrations, models
+
+
+def move_lesson_files(apps, schema_editor):
+    """Move existing uploads out of the public MEDIA_ROOT into the protected storage"""
+    Lesson = apps.get_model('courses', 'Lesson')
+    public, protected = storages['default'], storages['protected']
+    for video_file, pdf_file in Lesson.objects.values_list('video_file', 'pdf_file').iterator():
+        for name in (video_file, pdf_file):
+            if not name or protected.exists(name) or not public.exists(name):
+                continue
+            with public.open(name, 'rb') as fileobj:
+                protected.save(name, fileobj)
+            public.delete(name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_course_thumbnail_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lesson',
+            name='pdf_file',
+            field=models.FileField(blank=True, null=True, storage=django_elms.storage.protected_storage, upload_to='lesson_documents/'),
+        ),
+        migrations.AlterField(
+            model_name='lesson',
+            name='video_file',
+            field=models.FileField(blank=True, null=True, storage=django_elms.storage.protected_storage, upload_to='lesson_videos/'),
+        ),
+        migrations.RunPython(move_lesson_files, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,16 @@
-from django.db import models
+from collections import Counter
+from datetime import timedelta
+from django.db import models, transaction
+from django.db.models import Count, F, FloatField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Least, NullIf
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
 from users.models import User
+from django_elms.storage import protected_storage
 
 class Category(models.Model):
     """Course categories"""
@@ -17,6 +25,39 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+class CourseQuerySet(models.QuerySet):
+    def refresh_totals(self):
+        """Recompute the stored lesson count and duration with correlated subqueries"""
+        lessons = (
+            Lesson.objects.filter(module__course=OuterRef('pk'))
+            .order_by()
+            .values('module__course')
+        )
+        return self.update(
+            lesson_count=Coalesce(Subquery(lessons.annotate(total=Count('pk')).values('total')), 0),
+            total_duration_minutes=Coalesce(
+                Subquery(lessons.annotate(total=Sum('duration_minutes')).values('total')), 0
+            ),
+        )
+    
+    def bump_outline_version(self):
+        """Invalidate cached outlines (courses.outline) for these courses"""
+        return self.update(outline_version=F('outline_version') + 1)
+    
+    def apply_ratings(self, added=(), removed=()):
+        """Fold added/removed star ratings into the stored rating summary with one UPDATE"""
+        deltas = Counter(added)
+        deltas.subtract(removed)
+        new_count = F('rating_count') + sum(deltas.values())
+        new_sum = F('rating_sum') + sum(star * n for star, n in deltas.items())
+        stars = {f'rating_{star}': F(f'rating_{star}') + n for star, n in deltas.items() if n}
+        return self.update(
+            rating_count=new_count,
+            rating_sum=new_sum,
+            rating_average=Coalesce(Cast(new_sum, FloatField()) / NullIf(new_count, 0), Value(0.0)),
+            **stars,
+        )
+
 class Course(models.Model):
     """Main course model"""
     STATUS_CHOICES = [
@@ -44,28 +85,92 @@ class Course(models.Model):
     max_students = models.IntegerField(blank=True, null=True)
     requirements = models.TextField(blank=True, help_text="Course prerequisites")
     what_you_learn = models.TextField(blank=True, help_text="Learning outcomes")
+    lesson_count = models.PositiveIntegerField(default=0, editable=False)
+    total_duration_minutes = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_average = models.FloatField(default=0.0, editable=False)
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
+    outline_version = models.PositiveIntegerField(default=1, editable=False)
+    seats_taken = models.PositiveIntegerField(default=0, editable=False, help_text="Enrollments plus unexpired seat reservations")
+    thumbnail_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized thumbnail files by format and width")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CourseQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'rating_average'], name='course_status_rating_idx'),
+        ]
     
     def __str__(self):
         return self.title
     
+    FACET_FIELDS = ('status', 'category_id', 'level', 'price')
+    # Maintained with F() updates by courses.signals (and background jobs); a full save() must not overwrite them
+    COUNTER_FIELDS = (
+        'lesson_count', 'total_duration_minutes', 'rating_count', 'rating_sum', 'rating_average',
+        'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5', 'outline_version', 'seats_taken',
+        'thumbnail_variants',
+    )
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_facets = tuple(instance.__dict__.get(name) for name in cls.FACET_FIELDS)
+        instance._loaded_thumbnail = instance.__dict__.get('thumbnail')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
     def get_absolute_url(self):
         return reverse('courses:course_detail', kwargs={'pk': self.pk})
     
+    @property
+    def seats_left(self):
+        if self.max_students is None:
+            return None
+        return max(self.max_students - self.seats_taken, 0)
+    
+    def claim_seats(self, count=1):
+        """Atomically take ``count`` seats; False if that would oversubscribe the course"""
+        claimed = Course.objects.filter(
+            Q(max_students__isnull=True) | Q(seats_taken__lte=F('max_students') - count), pk=self.pk
+        ).update(seats_taken=F('seats_taken') + count)
+        return bool(claimed)
+    
+    def release_seats(self, count=1):
+        if count:
+            Course.objects.filter(pk=self.pk, seats_taken__gte=count).update(seats_taken=F('seats_taken') - count)
+    
     @property
     def total_lessons(self):
-        return sum(module.lessons.count() for module in self.modules.all())
+        return self.lesson_count
     
     @property
     def average_rating(self):
-        ratings = self.reviews.all()
-        if ratings:
-            return sum(r.rating for r in ratings) / len(ratings)
-        return 0
+        return self.rating_average
+    
+    @property
+    def rating_histogram(self):
+        """(stars, count, percentage) rows from five stars down to one"""
+        rows = []
+        for stars in range(5, 0, -1):
+            count = getattr(self, f'rating_{stars}')
+            rows.append((stars, count, count * 100 / self.rating_count if self.rating_count else 0))
+        return rows
 
 class Module(models.Model):
     """Course modules/chapters"""
@@ -81,6 +186,13 @@ class Module(models.Model):
     
     def __str__(self):
         return f"{self.course.title} - {self.title}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_course_id = instance.__dict__.get('course_id')
+        instance._loaded_order = instance.__dict__.get('order')
+        return instance
 
 class Lesson(models.Model):
     """Individual lessons within modules"""
@@ -96,9 +208,9 @@ class Lesson(models.Model):
     description = models.TextField(blank=True)
     lesson_type = models.CharField(max_length=20, choices=LESSON_TYPES)
     content = models.TextField(blank=True, help_text="Text content or HTML")
-    video_file = models.FileField(upload_to='lesson_videos/', blank=True, null=True)
+    video_file = models.FileField(upload_to='lesson_videos/', storage=protected_storage, blank=True, null=True)
     video_url = models.URLField(blank=True, help_text="YouTube/Vimeo URL")
-    pdf_file = models.FileField(upload_to='lesson_documents/', blank=True, null=True)
+    pdf_file = models.FileField(upload_to='lesson_documents/', storage=protected_storage, blank=True, null=True)
     external_link = models.URLField(blank=True)
     duration_minutes = models.IntegerField(default=0)
     order = models.PositiveIntegerField(default=1)
@@ -111,6 +223,66 @@ class Lesson(models.Model):
     
     def __str__(self):
         return f"{self.module.title} - {self.title}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_module_id = instance.__dict__.get('module_id')
+        instance._loaded_duration = instance.__dict__.get('duration_minutes')
+        instance._loaded_order = instance.__dict__.get('order')
+        return instance
+
+class EnrollmentQuerySet(models.QuerySet):
+    def shift_progress(self, delta=0):
+        """Add ``delta`` to the completed-lesson counters and recompute percentages in SQL"""
+        return self._set_progress(F('lessons_completed') + delta)
+    
+    def recount_progress(self):
+        """Recount the completed lessons from LessonProgress and recompute percentages in SQL"""
+        return self._set_progress(Coalesce(Subquery(
+            LessonProgress.objects.filter(enrollment=OuterRef('pk'), completed=True)
+            .values('enrollment').annotate(count=Count('pk')).values('count')
+        ), 0))
+    
+    def _set_progress(self, completed):
+        total_lessons = Subquery(Course.objects.filter(pk=OuterRef('course_id')).values('lesson_count'))
+        return self.update(
+            lessons_completed=completed,
+            progress_percentage=Coalesce(
+                Least(Cast(completed, FloatField()) * 100.0 / NullIf(total_lessons, 0), Value(100.0)),
+                Value(0.0),
+            ),
+        )
+
+    def enroll(self, student, course):
+        """
+        Enroll ``student``, consuming their seat reservation or claiming a new seat.
+
+        Raises CourseFull when a capped course has no seat left, and
+        IntegrityError if the student is already enrolled.
+        """
+        with transaction.atomic():
+            # The student's own hold still counts in seats_taken until it is released, even
+            # once expired, so it passes to the enrollment and neither side touches the counter
+            held, _ = seats_handled(SeatReservation.objects.filter(course=course, student=student)).delete()
+            if not held and not course.claim_seats():
+                if not SeatReservation.objects.filter(course=course).release_expired() or not course.claim_seats():
+                    raise CourseFull(course)
+            enrollment = seats_handled(self.model(student=student, course=course))
+            enrollment.save(force_insert=True, using=self.db)
+            return enrollment
+
+def seats_handled(obj):
+    """
+    Mark an Enrollment/SeatReservation instance, or a queryset about to be
+    deleted, whose seat the caller has already claimed or released, so the
+    signals in courses.signals leave Course.seats_taken alone.
+    """
+    obj._seats_handled = True
+    return obj
+
+class CourseFull(Exception):
+    """No seat is left on a capped course"""
 
 class Enrollment(models.Model):
     """Student course enrollments"""
@@ -118,8 +290,19 @@ class Enrollment(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollments')
     enrolled_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(blank=True, null=True)
+    lessons_completed = models.PositiveIntegerField(default=0)
     progress_percentage = models.FloatField(default=0.0)
     certificate_issued = models.BooleanField(default=False)
+    next_lesson = models.ForeignKey(
+        'Lesson', on_delete=models.SET_NULL, blank=True, null=True, related_name='+',
+        help_text="First incomplete lesson in outline order; null once everything is done"
+    )
+    last_accessed_lesson = models.ForeignKey(
+        'Lesson', on_delete=models.SET_NULL, blank=True, null=True, related_name='+'
+    )
+    last_accessed_at = models.DateTimeField(blank=True, null=True)
+    
+    objects = EnrollmentQuerySet.as_manager()
     
     class Meta:
         unique_together = ['student', 'course']
@@ -127,16 +310,109 @@ class Enrollment(models.Model):
     def __str__(self):
         return f"{self.student.username} - {self.course.title}"
     
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.next_lesson_id is None:
+            self.next_lesson_id = (
+                Lesson.objects.filter(module__course=self.course_id)
+                .order_by('module__order', 'order')
+                .values_list('pk', flat=True)
+                .first()
+            )
+        super().save(*args, **kwargs)
+    
+    def advance_past(self, lesson_id, outline):
+        """Move the resume pointer on after ``lesson_id`` was completed"""
+        if self.next_lesson_id not in (lesson_id, None):
+            return
+        completed = set(
+            LessonProgress.objects.filter(enrollment=self, completed=True).values_list('lesson_id', flat=True)
+        )
+        next_lesson = outline.first_incomplete(completed, after=lesson_id)
+        self.next_lesson_id = next_lesson.id if next_lesson else None
+        Enrollment.objects.filter(pk=self.pk).update(next_lesson_id=self.next_lesson_id)
+    
+    def sync_progress(self, records, outline):
+        """
+        Apply a batch of ``{lesson_id, completed_at, time_spent}`` records in one transaction.
+
+        Existing rows keep their original completion time and accumulate
+        ``time_spent`` (minutes). Counters and the resume pointer are updated
+        once for the whole batch. Returns the number of newly completed lessons.
+        """
+        batch = {}
+        for record in records:
+            if not isinstance(record, dict):
+                raise ValidationError('Each record must be an object.')
+            lesson_id = record.get('lesson_id')
+            if lesson_id not in outline:
+                raise ValidationError(f'Lesson {lesson_id!r} is not part of this course.')
+            completed_at = record.get('completed_at')
+            if completed_at is not None:
+                try:
+                    completed_at = parse_datetime(completed_at)
+                except (TypeError, ValueError):
+                    completed_at = None
+                if completed_at is None:
+                    raise ValidationError(f'Invalid completed_at for lesson {lesson_id}.')
+                if timezone.is_naive(completed_at):
+                    completed_at = timezone.make_aware(completed_at)
+            time_spent = record.get('time_spent', 0)
+            if not isinstance(time_spent, int) or isinstance(time_spent, bool) or time_spent < 0:
+                raise ValidationError(f'Invalid time_spent for lesson {lesson_id}.')
+            completed_at = completed_at or timezone.now()
+            if lesson_id in batch:
+                earlier, spent = batch[lesson_id]
+                batch[lesson_id] = (min(earlier, completed_at), spent + time_spent)
+            else:
+                batch[lesson_id] = (completed_at, time_spent)
+        if not batch:
+            return 0
+        
+        with transaction.atomic():
+            # Serialize syncs for this enrollment so a lesson is only counted as new once
+            Enrollment.objects.select_for_update().filter(pk=self.pk).values_list('pk').first()
+            existing = {
+                lesson_id: (completed, completed_at, time_spent)
+                for lesson_id, completed, completed_at, time_spent in LessonProgress.objects
+                .select_for_update()
+                .filter(enrollment=self, lesson_id__in=batch)
+                .values_list('lesson_id', 'completed', 'completed_at', 'time_spent_minutes')
+            }
+            rows = []
+            newly_completed = set()
+            for lesson_id, (completed_at, time_spent) in batch.items():
+                was_completed, previous_at, previous_spent = existing.get(lesson_id, (False, None, 0))
+                if was_completed:
+                    completed_at = previous_at or completed_at
+                else:
+                    newly_completed.add(lesson_id)
+                rows.append(LessonProgress(
+                    enrollment=self, lesson_id=lesson_id, completed=True,
+                    completed_at=completed_at, time_spent_minutes=previous_spent + time_spent,
+                ))
+            LessonProgress.objects.bulk_create(
+                rows, update_conflicts=True, unique_fields=['enrollment', 'lesson'],
+                update_fields=['completed', 'completed_at', 'time_spent_minutes'],
+            )
+            if newly_completed:
+                Enrollment.objects.filter(pk=self.pk).recount_progress()
+                if self.next_lesson_id in newly_completed:
+                    self.advance_past(self.next_lesson_id, outline)
+        self.refresh_from_db(fields=['lessons_completed', 'progress_percentage', 'next_lesson'])
+        return len(newly_completed)
+    
     def calculate_progress(self):
+        """Full recount for a single enrollment; the counters are normally kept incrementally"""
         total_lessons = self.course.total_lessons
-        if total_lessons == 0:
-            return 0
-        completed_lessons = LessonProgress.objects.filter(
+        self.lessons_completed = LessonProgress.objects.filter(
             enrollment=self,
             completed=True
         ).count()
-        self.progress_percentage = (completed_lessons / total_lessons) * 100
-        self.save()
+        if total_lessons == 0:
+            self.progress_percentage = 0.0
+        else:
+            self.progress_percentage = min(self.lessons_completed / total_lessons * 100, 100.0)
+        self.save(update_fields=['lessons_completed', 'progress_percentage'])
         return self.progress_percentage
 
 class LessonProgress(models.Model):
@@ -152,6 +428,27 @@ class LessonProgress(models.Model):
     
     def __str__(self):
         return f"{self.enrollment.student.username} - {self.lesson.title}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so signal handlers can detect a flip
+        instance._loaded_completed = instance.__dict__.get('completed')
+        return instance
+    
+    def mark_completed(self, when=None):
+        """Flip this row to completed; returns False if it already was"""
+        when = when or timezone.now()
+        with transaction.atomic():
+            flipped = LessonProgress.objects.filter(pk=self.pk, completed=False).update(
+                completed=True, completed_at=when
+            )
+            if flipped:
+                Enrollment.objects.filter(pk=self.enrollment_id).shift_progress(1)
+        if flipped:
+            self.completed_at = when
+        self.completed = self._loaded_completed = True
+        return bool(flipped)
 
 class Review(models.Model):
     """Course reviews/ratings"""
@@ -165,4 +462,61 @@ class Review(models.Model):
         unique_together = ['course', 'student']
     
     def __str__(self):
-        return f"{self.course.title} - Ascending - Descending"
\ No newline at end of file
+        return f"{self.course.title} - Ascending - Descending"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_course_id = instance.__dict__.get('course_id')
+        instance._loaded_rating = instance.__dict__.get('rating')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # The course rating summary is updated from post_save; keep both in one transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+class SeatReservationQuerySet(models.QuerySet):
+    def release_expired(self):
+        """Delete expired reservations and hand their seats back; returns the number released"""
+        released = 0
+        expired = self.filter(expires_at__lte=timezone.now())
+        for course_id in expired.order_by().values_list('course_id', flat=True).distinct():
+            # Only rows this statement actually deleted are released, so concurrent sweeps cannot double count
+            deleted, _ = seats_handled(expired.filter(course_id=course_id)).delete()
+            Course(pk=course_id).release_seats(deleted)
+            released += deleted
+        return released
+
+class SeatReservation(models.Model):
+    """Time-limited hold on a seat in a capped course"""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='seat_reservations')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='seat_reservations')
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = SeatReservationQuerySet.as_manager()
+    
+    class Meta:
+        unique_together = ['course', 'student']
+    
+    def __str__(self):
+        return f"{self.student.username} - {self.course.title} until {self.expires_at:%Y-%m-%d %H:%M}"
+    
+    @classmethod
+    def reserve(cls, student, course, minutes):
+        """Hold a seat for ``minutes``, extending an existing hold; raises CourseFull"""
+        expires_at = timezone.now() + timedelta(minutes=minutes)
+        with transaction.atomic():
+            if cls.objects.filter(course=course, student=student, expires_at__gt=timezone.now()).update(expires_at=expires_at):
+                return expires_at
+            cls.objects.filter(course=course, student=student).release_expired()
+            if not course.claim_seats():
+                if not cls.objects.filter(course=course).release_expired() or not course.claim_seats():
+                    raise CourseFull(course)
+            seats_handled(cls(course=course, student=student, expires_at=expires_at)).save(force_insert=True)
+        return expires_at
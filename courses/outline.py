@@ -0,0 +1,132 @@
+"""
+Cached module/lesson tree for a course.
+
+Outlines are cached under the course's ``outline_version``, which
+courses.signals bumps whenever a module or lesson is saved or deleted, so a
+stale tree is never read and an unchanged course costs no outline queries.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from django.conf import settings
+from django.core.cache import cache
+from .models import Course, Enrollment, Lesson, LessonProgress, Module
+
+LESSON_TYPE_LABELS = dict(Lesson.LESSON_TYPES)
+
+
+@dataclass(frozen=True)
+class OutlineLesson:
+    id: int
+    module_id: int
+    title: str
+    lesson_type: str
+    duration_minutes: int
+    is_preview: bool
+    order: int
+
+    def get_lesson_type_display(self):
+        return LESSON_TYPE_LABELS.get(self.lesson_type, self.lesson_type)
+
+
+@dataclass(frozen=True)
+class OutlineModule:
+    id: int
+    title: str
+    description: str
+    order: int
+    lessons: tuple
+
+
+class CourseOutline:
+    def __init__(self, course_id, version, modules):
+        self.course_id = course_id
+        self.version = version
+        self.modules = tuple(modules)
+        self.lessons = tuple(lesson for module in self.modules for lesson in module.lessons)
+        self._positions = {lesson.id: index for index, lesson in enumerate(self.lessons)}
+
+    def __contains__(self, lesson_id):
+        return lesson_id in self._positions
+
+    def lesson(self, lesson_id):
+        position = self._positions.get(lesson_id)
+        return None if position is None else self.lessons[position]
+
+    @property
+    def first_lesson(self):
+        return self.lessons[0] if self.lessons else None
+
+    def next_lesson(self, lesson_id):
+        position = self._positions.get(lesson_id)
+        if position is None or position + 1 >= len(self.lessons):
+            return None
+        return self.lessons[position + 1]
+
+    def first_incomplete(self, completed, after=None):
+        """First lesson not in ``completed``, scanning on from ``after`` and wrapping around"""
+        position = self._positions.get(after)
+        start = 0 if position is None else position + 1
+        for lesson in self.lessons[start:] + self.lessons[:start]:
+            if lesson.id not in completed:
+                return lesson
+        return None
+
+    def previous_lesson(self, lesson_id):
+        position = self._positions.get(lesson_id)
+        if not position:
+            return None
+        return self.lessons[position - 1]
+
+
+def outline_cache_key(course_id, version):
+    return f'courses:outline:{course_id}:{version}'
+
+
+def build_outline(course):
+    """Load the tree with two queries, skipping lesson bodies"""
+    lessons = {}
+    lesson_rows = Lesson.objects.filter(module__course=course).order_by('order').values_list(
+        'id', 'module_id', 'title', 'lesson_type', 'duration_minutes', 'is_preview', 'order'
+    )
+    for row in lesson_rows:
+        lesson = OutlineLesson(*row)
+        lessons.setdefault(lesson.module_id, []).append(lesson)
+    modules = [
+        OutlineModule(module_id, title, description, order, tuple(lessons.get(module_id, ())))
+        for module_id, title, description, order in Module.objects.filter(course=course)
+        .order_by('order')
+        .values_list('id', 'title', 'description', 'order')
+    ]
+    return CourseOutline(course.pk, course.outline_version, modules)
+
+
+def get_outline(course):
+    key = outline_cache_key(course.pk, course.outline_version)
+    outline = cache.get(key)
+    if outline is None:
+        outline = build_outline(course)
+        cache.set(key, outline, settings.COURSE_OUTLINE_TIMEOUT)
+    return outline
+
+
+def recompute_resume_pointers(course_id, batch_size=1000):
+    """Point every enrollment of a course at its first incomplete lesson in one pass"""
+    course = Course.objects.filter(pk=course_id).first()
+    if course is None:
+        return 0
+    outline = get_outline(course)
+    completed = defaultdict(set)
+    for enrollment_id, lesson_id in LessonProgress.objects.filter(
+        enrollment__course=course, completed=True
+    ).values_list('enrollment_id', 'lesson_id').iterator(chunk_size=batch_size):
+        completed[enrollment_id].add(lesson_id)
+
+    changed = []
+    for enrollment in Enrollment.objects.filter(course=course).only('pk', 'next_lesson_id').iterator(chunk_size=batch_size):
+        lesson = outline.first_incomplete(completed[enrollment.pk])
+        lesson_id = lesson.id if lesson else None
+        if enrollment.next_lesson_id != lesson_id:
+            enrollment.next_lesson_id = lesson_id
+            changed.append(enrollment)
+    Enrollment.objects.bulk_update(changed, ['next_lesson'], batch_size=batch_size)
+    return len(changed)
@@ -0,0 +1,145 @@
+"""
+Full-text search backends for the course catalog.
+
+The default backend keeps an SQLite FTS5 index in sync with ``Course`` rows
+(see ``courses.signals``). Other databases fall back to ``LikeSearchBackend``
+unless ``COURSE_SEARCH_BACKEND`` names a dotted path to a ``BaseSearchBackend``
+subclass.
+"""
+import re
+import uuid
+from collections import namedtuple
+from functools import lru_cache
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+SearchHit = namedtuple('SearchHit', ['course_id', 'snippet'])
+
+MAX_TERMS = 8
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+
+def search_terms(query):
+    """Split free text into word tokens, dropping FTS syntax characters"""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def highlight(snippet):
+    """Escape a raw snippet and turn the match markers into <mark> tags"""
+    if not snippet:
+        return ''
+    html = escape(snippet).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+    return mark_safe(html)
+
+
+class BaseSearchBackend:
+    def index(self, course):
+        """Add or replace the index entry for ``course``"""
+        raise NotImplementedError
+
+    def remove(self, course_id):
+        raise NotImplementedError
+
+    def rebuild(self):
+        """Reindex every course; returns the number of indexed rows"""
+        raise NotImplementedError
+
+    def search(self, query, limit=None, status=None):
+        """
+        Return SearchHits ordered by relevance, best first. ``status``
+        restricts hits to courses with that status before ``limit`` applies.
+        """
+        raise NotImplementedError
+
+
+class LikeSearchBackend(BaseSearchBackend):
+    """Unindexed fallback matching the original icontains search"""
+
+    def index(self, course):
+        pass
+
+    def remove(self, course_id):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def search(self, query, limit=None, status=None):
+        from .models import Course
+
+        query = query.strip()
+        if not query:
+            return []
+        courses = Course.objects.all() if status is None else Course.objects.filter(status=status)
+        course_ids = courses.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(instructor__username__icontains=query)
+        ).values_list('pk', flat=True)[:limit or settings.COURSE_SEARCH_MAX_RESULTS]
+        return [SearchHit(course_id, '') for course_id in course_ids]
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """Ranked prefix search over an FTS5 virtual table created by courses.0006"""
+    table = 'courses_course_fts'
+    # bm25 weights per column: course_id (unindexed), title, description, instructor
+    weights = (0.0, 10.0, 1.0, 4.0)
+
+    def index(self, course):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE course_id = %s', [course.pk.hex])
+            cursor.execute(
+                f'INSERT INTO {self.table} (course_id, title, description, instructor) VALUES (%s, %s, %s, %s)',
+                [course.pk.hex, course.title, course.description, course.instructor.username],
+            )
+
+    def remove(self, course_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE course_id = %s', [uuid.UUID(str(course_id)).hex])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (course_id, title, description, instructor) '
+                'SELECT c.id, c.title, c.description, u.username '
+                'FROM courses_course c JOIN users_user u ON u.id = c.instructor_id'
+            )
+            return cursor.rowcount
+
+    def search(self, query, limit=None, status=None):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for weight in self.weights)
+        params = [HIGHLIGHT_START, HIGHLIGHT_END, match]
+        # Filter on the course row inside the query so the limit only counts eligible courses
+        status_filter = ''
+        if status is not None:
+            status_filter = 'AND c.status = %s '
+            params.append(status)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {self.table}.course_id, snippet({self.table}, 2, %s, %s, '…', 16) "
+                f'FROM {self.table} JOIN courses_course c ON c.id = {self.table}.course_id '
+                f'WHERE {self.table} MATCH %s {status_filter}'
+                f'ORDER BY bm25({self.table}, {weights}) LIMIT %s',
+                params + [limit or settings.COURSE_SEARCH_MAX_RESULTS],
+            )
+            return [SearchHit(uuid.UUID(course_id), highlight(snippet)) for course_id, snippet in cursor.fetchall()]
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    backend_path = getattr(settings, 'COURSE_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTS5Backend()
+    return LikeSearchBackend()
@@ -0,0 +1,174 @@
+from functools import partial
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from .models import Course, Enrollment, Lesson, LessonProgress, Module, Review, SeatReservation
+from .facets import invalidate_facets
+from .outline import recompute_resume_pointers
+from .search import get_search_backend
+from .thumbnails import generate_course_thumbnails, thumbnail_directory
+from users.models import User
+from django_elms.background import run_in_background
+from django_elms.images import delete_variants, variant_names
+from django_elms.signals import deleted_via
+
+
+@receiver(post_save, sender=LessonProgress)
+def lesson_progress_saved(sender, instance, created, **kwargs):
+    was_completed = False if created else bool(getattr(instance, '_loaded_completed', False))
+    if instance.completed != was_completed:
+        Enrollment.objects.filter(pk=instance.enrollment_id).shift_progress(1 if instance.completed else -1)
+    instance._loaded_completed = instance.completed
+
+
+@receiver(post_delete, sender=LessonProgress)
+def lesson_progress_deleted(sender, instance, origin=None, **kwargs):
+    # Cascades from a lesson, module, course or enrollment are handled in bulk below
+    if instance.completed and deleted_via(origin, LessonProgress):
+        Enrollment.objects.filter(pk=instance.enrollment_id).shift_progress(-1)
+
+
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance, created, update_fields=None, **kwargs):
+    get_search_backend().index(instance)
+    facets = tuple(getattr(instance, name) for name in Course.FACET_FIELDS)
+    if created or facets != getattr(instance, '_loaded_facets', None):
+        invalidate_facets()
+    instance._loaded_facets = facets
+
+    if update_fields is None or 'thumbnail' in update_fields:
+        thumbnail = instance.thumbnail.name or ''
+        if thumbnail != (getattr(instance, '_loaded_thumbnail', None) or ''):
+            run_in_background(generate_course_thumbnails, instance.pk)
+        instance._loaded_thumbnail = thumbnail
+
+
+@receiver(post_save, sender=User)
+def instructor_saved(sender, instance, created, update_fields=None, **kwargs):
+    # The search index stores the instructor's username, so a rename reindexes their courses
+    if not created and (update_fields is None or 'username' in update_fields):
+        loaded = getattr(instance, '_loaded_username', None)
+        if loaded is not None and loaded != instance.username:
+            backend = get_search_backend()
+            for course in Course.objects.filter(instructor=instance).select_related('instructor'):
+                backend.index(course)
+    instance._loaded_username = instance.username
+
+
+@receiver(post_delete, sender=Course)
+def course_deleted(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+    invalidate_facets()
+    if instance.thumbnail_variants:
+        run_in_background(delete_variants, variant_names(instance.thumbnail_variants), thumbnail_directory(instance.pk))
+
+
+def _refresh_courses(course_ids, totals=True, progress=True, reordered=True):
+    """Invalidate outlines and recompute stored totals, percentages and resume pointers for courses"""
+    course_ids = {pk for pk in course_ids if pk is not None}
+    if not course_ids:
+        return
+    courses = Course.objects.filter(pk__in=course_ids)
+    courses.bump_outline_version()
+    if totals:
+        courses.refresh_totals()
+    if totals and progress:
+        Enrollment.objects.filter(course_id__in=course_ids).shift_progress()
+    if reordered:
+        for course_id in course_ids:
+            transaction.on_commit(partial(recompute_resume_pointers, course_id))
+
+
+# Course.seats_taken counts Enrollment and SeatReservation rows. Code that checks
+# capacity claims or releases seats itself and marks the rows with seats_handled();
+# any other create or delete (admin, shell, user cascades) is counted here.
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_save, sender=SeatReservation)
+def seat_holder_saved(sender, instance, created, **kwargs):
+    # The mark only covers the insert; a later delete of the same instance still releases
+    if created and not instance.__dict__.pop('_seats_handled', False):
+        Course.objects.filter(pk=instance.course_id).update(seats_taken=F('seats_taken') + 1)
+
+
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_delete, sender=SeatReservation)
+def seat_holder_deleted(sender, instance, origin=None, **kwargs):
+    if getattr(origin, '_seats_handled', False) or deleted_via(origin, Course):
+        return
+    Course(pk=instance.course_id).release_seats()
+
+
+@receiver(post_save, sender=Lesson)
+def lesson_saved(sender, instance, created, **kwargs):
+    previous_module = getattr(instance, '_loaded_module_id', instance.module_id)
+    course_ids = set(
+        Module.objects.filter(pk__in={instance.module_id, previous_module}).values_list('course_id', flat=True)
+    )
+    moved = previous_module != instance.module_id
+    resized = instance.duration_minutes != getattr(instance, '_loaded_duration', instance.duration_minutes)
+    _refresh_courses(
+        course_ids,
+        totals=created or moved or resized,
+        progress=created or len(course_ids) > 1,
+        reordered=created or moved or instance.order != getattr(instance, '_loaded_order', instance.order),
+    )
+    instance._loaded_module_id = instance.module_id
+    instance._loaded_duration = instance.duration_minutes
+    instance._loaded_order = instance.order
+
+
+@receiver(pre_delete, sender=Lesson)
+def lesson_deleting(sender, instance, origin=None, **kwargs):
+    if deleted_via(origin, Course):
+        return
+    instance._course_id = Module.objects.values_list('course_id', flat=True).get(pk=instance.module_id)
+    Enrollment.objects.filter(
+        lessonprogress__lesson=instance, lessonprogress__completed=True
+    ).shift_progress(-1)
+
+
+@receiver(post_delete, sender=Lesson)
+def lesson_deleted(sender, instance, origin=None, **kwargs):
+    # A module delete refreshes its course once after all of its lessons are gone
+    if not deleted_via(origin, Module):
+        _refresh_courses([getattr(instance, '_course_id', None)])
+
+
+@receiver(post_save, sender=Module)
+def module_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_loaded_course_id', instance.course_id)
+    _refresh_courses(
+        [previous, instance.course_id],
+        totals=previous != instance.course_id,
+        reordered=previous != instance.course_id or instance.order != getattr(instance, '_loaded_order', instance.order),
+    )
+    instance._loaded_course_id = instance.course_id
+    instance._loaded_order = instance.order
+
+
+@receiver(post_delete, sender=Module)
+def module_deleted(sender, instance, origin=None, **kwargs):
+    if not deleted_via(origin, Course):
+        _refresh_courses([instance.course_id])
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    if created:
+        Course.objects.filter(pk=instance.course_id).apply_ratings(added=[instance.rating])
+    else:
+        previous_course = getattr(instance, '_loaded_course_id', instance.course_id)
+        previous_rating = getattr(instance, '_loaded_rating', instance.rating)
+        if (previous_course, previous_rating) != (instance.course_id, instance.rating):
+            Course.objects.filter(pk=previous_course).apply_ratings(removed=[previous_rating])
+            Course.objects.filter(pk=instance.course_id).apply_ratings(added=[instance.rating])
+    instance._loaded_course_id = instance.course_id
+    instance._loaded_rating = instance.rating
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, origin=None, **kwargs):
+    if not deleted_via(origin, Course):
+        Course.objects.filter(pk=instance.course_id).apply_ratings(removed=[instance.rating])
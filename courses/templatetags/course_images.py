@@ -0,0 +1,33 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+def srcset(variants):
+    return ', '.join(f'{default_storage.url(name)} {width}w' for width, name in sorted(variants.items(), key=lambda item: int(item[0])))
+
+
+@register.simple_tag
+def course_thumbnail(course, sizes='(min-width: 768px) 33vw, 100vw', css_class='', alt=None):
+    """
+    <picture> for a course thumbnail with WebP and JPEG srcsets; falls back
+    to the original upload until the variants have been generated.
+    """
+    alt = course.title if alt is None else alt
+    variants = course.thumbnail_variants or {}
+    if not variants.get('jpeg'):
+        if not course.thumbnail:
+            return ''
+        return format_html('<img src="{}" alt="{}" class="{}" loading="lazy">', course.thumbnail.url, alt, css_class)
+
+    fallback = default_storage.url(min(variants['jpeg'].items(), key=lambda item: int(item[0]))[1])
+    sources = format_html_join(
+        '', '<source type="image/{}" srcset="{}" sizes="{}">',
+        ((fmt, srcset(variants[fmt]), sizes) for fmt in ('webp',) if variants.get(fmt)),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" loading="lazy"></picture>',
+        sources, fallback, srcset(variants['jpeg']), sizes, variants['width'], variants['height'], alt, css_class,
+    )
@@ -1,3 +1,122 @@
+from datetime import timedelta
 from django.test import TestCase
+from django.utils import timezone
+from users.models import User
+from .models import Category, Course, CourseFull, Enrollment, Lesson, LessonProgress, Module, SeatReservation
+from .outline import get_outline
 
-# Create your tests here.
+
+class SeatCounterTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user('instructor', 'instructor@example.com', 'pw', role='instructor')
+        category = Category.objects.create(name='Programming', slug='programming')
+        self.course = Course.objects.create(
+            title='Python', description='Basics', instructor=self.instructor, category=category,
+            status='published', max_students=2,
+        )
+        self.students = [
+            User.objects.create_user(f'student{i}', f'student{i}@example.com', 'pw') for i in range(3)
+        ]
+
+    def seats_taken(self):
+        return Course.objects.values_list('seats_taken', flat=True).get(pk=self.course.pk)
+
+    def test_enroll_claims_a_seat(self):
+        Enrollment.objects.enroll(self.students[0], self.course)
+        self.assertEqual(self.seats_taken(), 1)
+
+    def test_enroll_raises_when_full(self):
+        Enrollment.objects.enroll(self.students[0], self.course)
+        Enrollment.objects.enroll(self.students[1], self.course)
+        with self.assertRaises(CourseFull):
+            Enrollment.objects.enroll(self.students[2], self.course)
+        self.assertEqual(self.seats_taken(), 2)
+
+    def test_enroll_consumes_reservation(self):
+        SeatReservation.reserve(self.students[0], self.course, minutes=15)
+        self.assertEqual(self.seats_taken(), 1)
+        Enrollment.objects.enroll(self.students[0], self.course)
+        self.assertEqual(self.seats_taken(), 1)
+        self.assertFalse(SeatReservation.objects.exists())
+
+    def test_enroll_consumes_own_expired_reservation_on_full_course(self):
+        SeatReservation.reserve(self.students[0], self.course, minutes=15)
+        Enrollment.objects.enroll(self.students[1], self.course)
+        SeatReservation.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        Enrollment.objects.enroll(self.students[0], self.course)
+        self.assertEqual(self.seats_taken(), 2)
+        self.assertFalse(SeatReservation.objects.exists())
+
+    def test_reserve_extends_existing_hold(self):
+        SeatReservation.reserve(self.students[0], self.course, minutes=15)
+        SeatReservation.reserve(self.students[0], self.course, minutes=30)
+        self.assertEqual(self.seats_taken(), 1)
+
+    def test_delete_releases_seat(self):
+        enrollment = Enrollment.objects.enroll(self.students[0], self.course)
+        enrollment.delete()
+        self.assertEqual(self.seats_taken(), 0)
+
+    def test_direct_create_and_delete_keep_counter_in_step(self):
+        # Admin and shell creates bypass enroll(); the counter must not drift either way
+        enrollment = Enrollment.objects.create(student=self.students[0], course=self.course)
+        self.assertEqual(self.seats_taken(), 1)
+        enrollment.delete()
+        self.assertEqual(self.seats_taken(), 0)
+
+    def test_deleting_live_reservation_frees_seat(self):
+        SeatReservation.reserve(self.students[0], self.course, minutes=15)
+        SeatReservation.objects.get().delete()
+        self.assertEqual(self.seats_taken(), 0)
+
+    def test_deleting_user_frees_their_seats(self):
+        Enrollment.objects.enroll(self.students[0], self.course)
+        SeatReservation.reserve(self.students[1], self.course, minutes=15)
+        self.students[0].delete()
+        self.students[1].delete()
+        self.assertEqual(self.seats_taken(), 0)
+
+    def test_release_expired_frees_each_seat_once(self):
+        SeatReservation.reserve(self.students[0], self.course, minutes=15)
+        SeatReservation.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(SeatReservation.objects.release_expired(), 1)
+        self.assertEqual(SeatReservation.objects.release_expired(), 0)
+        self.assertEqual(self.seats_taken(), 0)
+
+    def test_expired_reservation_does_not_block_enrollment(self):
+        SeatReservation.reserve(self.students[0], self.course, minutes=15)
+        SeatReservation.reserve(self.students[1], self.course, minutes=15)
+        SeatReservation.objects.filter(student=self.students[0]).update(expires_at=timezone.now() - timedelta(minutes=1))
+        Enrollment.objects.enroll(self.students[2], self.course)
+        self.assertEqual(self.seats_taken(), 2)
+        self.assertEqual(SeatReservation.objects.count(), 1)
+
+
+class ProgressSyncTests(TestCase):
+    def setUp(self):
+        instructor = User.objects.create_user('instructor', 'instructor@example.com', 'pw', role='instructor')
+        category = Category.objects.create(name='Programming', slug='programming')
+        self.course = Course.objects.create(
+            title='Python', description='Basics', instructor=instructor, category=category, status='published',
+        )
+        module = Module.objects.create(course=self.course, title='Intro', order=1)
+        self.lessons = [
+            Lesson.objects.create(module=module, title=f'Lesson {i}', lesson_type='text', order=i) for i in range(1, 5)
+        ]
+        student = User.objects.create_user('student', 'student@example.com', 'pw')
+        self.enrollment = Enrollment.objects.enroll(student, self.course)
+
+    def test_repeated_sync_counts_lessons_once(self):
+        records = [{'lesson_id': lesson.pk} for lesson in self.lessons[:2]]
+        outline = get_outline(self.course)
+        self.assertEqual(self.enrollment.sync_progress(records, outline), 2)
+        self.assertEqual(self.enrollment.sync_progress(records, outline), 0)
+        self.assertEqual(self.enrollment.lessons_completed, 2)
+        self.assertEqual(self.enrollment.progress_percentage, 50.0)
+
+    def test_sync_recounts_from_lesson_progress(self):
+        # A counter that drifted (e.g. a racing sync) is corrected rather than shifted further
+        LessonProgress.objects.create(enrollment=self.enrollment, lesson=self.lessons[0], completed=True)
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(lessons_completed=3)
+        self.enrollment.sync_progress([{'lesson_id': self.lessons[1].pk}], get_outline(self.course))
+        self.assertEqual(self.enrollment.lessons_completed, 2)
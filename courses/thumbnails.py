@@ -0,0 +1,40 @@
+"""
+Responsive derivatives of Course.thumbnail.
+
+Variants are generated off the request path (see courses.signals) and
+recorded in Course.thumbnail_variants; the course_images template tags
+turn them into srcset markup.
+"""
+from django.conf import settings
+from django_elms.images import delete_variants, render_variants, variant_directory, variant_names
+from .models import Course
+
+VARIANT_DIRECTORY = 'course_thumbnails/variants'
+
+
+def thumbnail_directory(course_id):
+    return variant_directory(VARIANT_DIRECTORY, course_id)
+
+
+def generate_course_thumbnails(course_id, force=False):
+    """Build the thumbnail variants for one course; returns False when there was nothing to do"""
+    course = Course.objects.only('thumbnail', 'thumbnail_variants').filter(pk=course_id).first()
+    if course is None:
+        return False
+    old = course.thumbnail_variants or {}
+    if not course.thumbnail:
+        variants = {}
+    elif not force and old.get('source') == course.thumbnail.name:
+        return False
+    else:
+        with course.thumbnail.open('rb') as source:
+            variants = render_variants(
+                source, settings.COURSE_THUMBNAIL_WIDTHS, settings.COURSE_THUMBNAIL_FORMATS, thumbnail_directory(course_id),
+            )
+        variants['source'] = course.thumbnail.name
+
+    # Only store the result if the thumbnail was not replaced while we were rendering
+    updated = Course.objects.filter(pk=course_id, thumbnail=course.thumbnail.name or '').update(thumbnail_variants=variants)
+    if updated:
+        delete_variants(variant_names(old) - variant_names(variants), thumbnail_directory(course_id))
+    return bool(updated)
@@ -7,8 +7,14 @@ urlpatterns = [
     path('', views.CourseListView.as_view(), name='course_list'),
     path('<uuid:pk>/', views.CourseDetailView.as_view(), name='course_detail'),
     path('<uuid:pk>/enroll/', views.enroll_course, name='enroll_course'),
+    path('<uuid:pk>/reserve/', views.reserve_seat, name='reserve_seat'),
     path('<uuid:pk>/learn/', views.course_learn, name='course_learn'),
     path('<uuid:course_pk>/lesson/<int:lesson_pk>/', views.lesson_view, name='lesson_view'),
+    path('<uuid:course_pk>/lesson/<int:lesson_pk>/video/', views.lesson_asset, {'kind': 'video'}, name='lesson_video'),
+    path('<uuid:course_pk>/lesson/<int:lesson_pk>/pdf/', views.lesson_asset, {'kind': 'pdf'}, name='lesson_pdf'),
+    path('<uuid:course_pk>/lesson/<int:lesson_pk>/heartbeat/', views.lesson_heartbeat, name='lesson_heartbeat'),
+    path('<uuid:pk>/progress/sync/', views.sync_progress, name='sync_progress'),
+    path('heartbeats/stats/', views.heartbeat_stats, name='heartbeat_stats'),
     path('instructor/courses/', views.instructor_courses, name='instructor_courses'),
     path('instructor/courses/create/', views.create_course, name='create_course'),
 ]
\ No newline at end of file
@@ -1,12 +1,23 @@
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.views.decorators.http import require_POST
 from django.views.generic import ListView, DetailView
 from django.contrib import messages
-from django.db.models import Q, Count, Avg
-from django.http import JsonResponse
+from django.db import IntegrityError
+from django.db.models import Count, Case, When, Value, IntegerField
+from django.http import Http404, JsonResponse
 from django.utils import timezone
-from .models import Course, Enrollment, Lesson, LessonProgress
+from .models import Course, CourseFull, Enrollment, Lesson, LessonProgress, SeatReservation
 from .forms import CourseForm
+from .outline import get_outline
+from .heartbeats import heartbeat_buffer
+from .facets import PRICE_BANDS, cached_facets, compute_facets, price_band_filter
+from .search import get_search_backend
+from django_elms.pagination import CursorPaginator, InvalidCursor
+from django_elms.streaming import serve_file
 from users.views import is_instructor
 from users.models import Notification
 from courses.models import Category
@@ -16,44 +27,97 @@ class CourseListView(ListView):
     template_name = 'courses/course_list.html'
     context_object_name = 'courses'
     paginate_by = 12
+    SORT_OPTIONS = ['title', '-title', 'price', '-price', 'created_at', '-created_at', 'rating_average', '-rating_average']
+    
+    FILTER_PARAMS = ['category', 'level', 'price', 'min_rating']
     
     def get_queryset(self):
+        queryset = self.get_filtered_queryset()
+        
+        # Sorting; searches default to relevance
+        search = self.request.GET.get('search')
+        sort_by = self.request.GET.get('sort', 'relevance' if search else '-created_at')
+        if sort_by == 'relevance' and search:
+            queryset = queryset.order_by('search_rank')
+        elif sort_by in self.SORT_OPTIONS:
+            queryset = queryset.order_by(sort_by)
+        
+        return queryset
+    
+    def get_filtered_queryset(self, exclude=None):
+        """Published courses matching the search and every filter except ``exclude``"""
         queryset = Course.objects.filter(status='published').select_related('instructor', 'category')
         
         # Search functionality
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | 
-                Q(description__icontains=search) |
-                Q(instructor__username__icontains=search)
+            hits = self.get_search_hits(search)
+            queryset = queryset.filter(pk__in=[hit.course_id for hit in hits]).annotate(
+                search_rank=Case(
+                    *[When(pk=hit.course_id, then=Value(rank)) for rank, hit in enumerate(hits)],
+                    default=Value(len(hits)),
+                    output_field=IntegerField(),
+                )
             )
         
         # Category filter
         category = self.request.GET.get('category')
-        if category:
+        if category and exclude != 'category':
             queryset = queryset.filter(category__slug=category)
         
         # Level filter
         level = self.request.GET.get('level')
-        if level:
+        if level and exclude != 'level':
             queryset = queryset.filter(level=level)
         
-        # Sorting
-        sort_by = self.request.GET.get('sort', '-created_at')
-        if sort_by in ['title', '-title', 'price', '-price', 'created_at', '-created_at']:
-            queryset = queryset.order_by(sort_by)
+        # Price band filter
+        price_band = price_band_filter(self.request.GET.get('price'))
+        if price_band is not None and exclude != 'price':
+            queryset = queryset.filter(price_band)
+        
+        # Minimum rating filter
+        min_rating = self.request.GET.get('min_rating')
+        if min_rating in ['1', '2', '3', '4', '5'] and exclude != 'min_rating':
+            queryset = queryset.filter(rating_average__gte=int(min_rating))
         
         return queryset
     
+    def get_search_hits(self, search):
+        if not hasattr(self, '_search_hits'):
+            self._search_hits = get_search_backend().search(search, status='published')
+        return self._search_hits
+    
+    def get_facets(self):
+        if self.request.GET.get('search') or any(self.request.GET.get(p) for p in self.FILTER_PARAMS):
+            return compute_facets(lambda name: self.get_filtered_queryset(exclude=name))
+        return cached_facets(self.get_filtered_queryset())
+    
+    def paginate_queryset(self, queryset, page_size):
+        ordering = queryset.query.order_by or self.model._meta.ordering
+        paginator = CursorPaginator(queryset, ordering, page_size)
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        return paginator, page, page.object_list, page.has_other_pages()
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all()
-        context['levels'] = Course.LEVEL_CHOICES
+        facets = self.get_facets()
+        context['categories'] = [
+            (category, facets['category'].get(category.slug, 0)) for category in Category.objects.all()
+        ]
+        context['levels'] = [(value, name, facets['level'].get(value, 0)) for value, name in Course.LEVEL_CHOICES]
+        context['price_bands'] = [(key, label, facets['price'].get(key, 0)) for key, label, _ in PRICE_BANDS]
         context['search_query'] = self.request.GET.get('search', '')
         context['selected_category'] = self.request.GET.get('category', '')
         context['selected_level'] = self.request.GET.get('level', '')
-        context['sort_by'] = self.request.GET.get('sort', '-created_at')
+        context['selected_price'] = self.request.GET.get('price', '')
+        context['min_rating'] = self.request.GET.get('min_rating', '')
+        context['sort_by'] = self.request.GET.get('sort', 'relevance' if context['search_query'] else '-created_at')
+        snippets = {hit.course_id: hit.snippet for hit in getattr(self, '_search_hits', [])}
+        for course in context['courses']:
+            course.search_snippet = snippets.get(course.pk, '')
         return context
 
 class CourseDetailView(DetailView):
@@ -63,7 +127,7 @@ class CourseDetailView(DetailView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        course = self.get_object()
+        course = self.object
         
         # Check if user is enrolled
         is_enrolled = False
@@ -78,7 +142,7 @@ class CourseDetailView(DetailView):
         context.update({
             'is_enrolled': is_enrolled,
             'enrollment': enrollment,
-            'modules': course.modules.prefetch_related('lessons').all(),
+            'modules': get_outline(course).modules,
             'reviews': course.reviews.select_related('student')[:10],
             'average_rating': course.average_rating,
             'discussions': course.discussions.select_related('author')[:5],
@@ -94,13 +158,15 @@ def enroll_course(request, pk):
         messages.warning(request, 'You are already enrolled in this course.')
         return redirect('courses:course_detail', pk=pk)
     
-    # Check if course is full
-    if course.max_students and course.enrollments.count() >= course.max_students:
+    # Create enrollment, claiming a seat atomically on capped courses
+    try:
+        enrollment = Enrollment.objects.enroll(request.user, course)
+    except CourseFull:
         messages.error(request, 'This course is full.')
         return redirect('courses:course_detail', pk=pk)
-    
-    # Create enrollment
-    enrollment = Enrollment.objects.create(student=request.user, course=course)
+    except IntegrityError:
+        messages.warning(request, 'You are already enrolled in this course.')
+        return redirect('courses:course_detail', pk=pk)
     
     # Create notification
     Notification.objects.create(
@@ -113,6 +179,24 @@ def enroll_course(request, pk):
     messages.success(request, f'Successfully enrolled in "{course.title}"!')
     return redirect('courses:course_learn', pk=pk)
 
+@login_required
+@require_POST
+def reserve_seat(request, pk):
+    """Hold a seat on a capped course for SEAT_RESERVATION_MINUTES"""
+    course = get_object_or_404(Course, pk=pk, status='published')
+    if Enrollment.objects.filter(student=request.user, course=course).exists():
+        messages.warning(request, 'You are already enrolled in this course.')
+        return redirect('courses:course_detail', pk=pk)
+    
+    try:
+        expires_at = SeatReservation.reserve(request.user, course, settings.SEAT_RESERVATION_MINUTES)
+    except CourseFull:
+        messages.error(request, 'This course is full.')
+        return redirect('courses:course_detail', pk=pk)
+    
+    messages.success(request, f'A seat is held for you until {timezone.localtime(expires_at):%H:%M}.')
+    return redirect('courses:course_detail', pk=pk)
+
 @login_required
 def course_learn(request, pk):
     """Course learning interface for enrolled students"""
@@ -125,32 +209,18 @@ def course_learn(request, pk):
         messages.error(request, 'You are not enrolled in this course.')
         return redirect('courses:course_detail', pk=pk)
     
-    # Get current lesson (first incomplete or first lesson)
-    current_lesson = None
-    completed_lessons = LessonProgress.objects.filter(
+    # Resume at the stored pointer; once everything is completed, show the first lesson
+    outline = get_outline(course)
+    current_lesson = outline.lesson(enrollment.next_lesson_id) or outline.first_lesson
+    completed_lessons = set(LessonProgress.objects.filter(
         enrollment=enrollment, completed=True
-    ).values_list('lesson_id', flat=True)
-    
-    for module in course.modules.all():
-        for lesson in module.lessons.all():
-            if lesson.id not in completed_lessons:
-                current_lesson = lesson
-                break
-        if current_lesson:
-            break
-    
-    if not current_lesson and course.modules.exists():
-        # All lessons completed, show first lesson
-        current_lesson = course.modules.first().lessons.first()
-    
-    # Update progress
-    enrollment.calculate_progress()
+    ).values_list('lesson_id', flat=True))
     
     context = {
         'course': course,
         'enrollment': enrollment,
         'current_lesson': current_lesson,
-        'modules': course.modules.prefetch_related('lessons').all(),
+        'modules': outline.modules,
         'completed_lessons': completed_lessons,
     }
     return render(request, 'courses/course_learn.html', context)
@@ -159,7 +229,10 @@ def course_learn(request, pk):
 def lesson_view(request, course_pk, lesson_pk):
     """Individual lesson view"""
     course = get_object_or_404(Course, pk=course_pk)
-    lesson = get_object_or_404(Lesson, pk=lesson_pk, module__course=course)
+    outline = get_outline(course)
+    if lesson_pk not in outline:
+        raise Http404('No lesson matches the given query.')
+    lesson = get_object_or_404(Lesson, pk=lesson_pk)
     
     # Check enrollment or preview
     if not lesson.is_preview:
@@ -171,19 +244,17 @@ def lesson_view(request, course_pk, lesson_pk):
     else:
         enrollment = None
     
+    if enrollment and enrollment.last_accessed_lesson_id != lesson.pk:
+        enrollment.last_accessed_lesson = lesson
+        enrollment.last_accessed_at = timezone.now()
+        enrollment.save(update_fields=['last_accessed_lesson', 'last_accessed_at'])
+    
     # Mark lesson as completed if POST request
     if request.method == 'POST' and enrollment:
-        progress, created = LessonProgress.objects.get_or_create(
-            enrollment=enrollment,
-            lesson=lesson,
-            defaults={'completed': True, 'completed_at': timezone.now()}
-        )
-        if not progress.completed:
-            progress.completed = True
-            progress.completed_at = timezone.now()
-            progress.save()
-        
-        enrollment.calculate_progress()
+        progress, created = LessonProgress.objects.get_or_create(enrollment=enrollment, lesson=lesson)
+        if progress.mark_completed():
+            enrollment.refresh_from_db(fields=['lessons_completed', 'progress_percentage'])
+            enrollment.advance_past(lesson.pk, outline)
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({'success': True, 'progress': enrollment.progress_percentage})
@@ -191,13 +262,98 @@ def lesson_view(request, course_pk, lesson_pk):
     context = {
         'course': course,
         'lesson': lesson,
+        'modules': outline.modules,
+        'previous_lesson': outline.previous_lesson(lesson.pk),
+        'next_lesson': outline.next_lesson(lesson.pk),
         'enrollment': enrollment,
+        'heartbeat_interval': settings.LESSON_HEARTBEAT_INTERVAL,
         'is_completed': enrollment and LessonProgress.objects.filter(
             enrollment=enrollment, lesson=lesson, completed=True
         ).exists() if enrollment else False,
     }
     return render(request, 'courses/lesson_detail.html', context)
 
+LESSON_ASSET_FIELDS = {'video': 'video_file', 'pdf': 'pdf_file'}
+
+@login_required
+def lesson_asset(request, course_pk, lesson_pk, kind):
+    """Stream a lesson's video or PDF to enrolled students, the instructor, or anyone for preview lessons"""
+    lesson = get_object_or_404(
+        Lesson.objects.select_related('module__course'), pk=lesson_pk, module__course_id=course_pk
+    )
+    course = lesson.module.course
+    allowed = (
+        lesson.is_preview
+        or request.user.is_staff
+        or course.instructor_id == request.user.pk
+        or Enrollment.objects.filter(student=request.user, course=course).exists()
+    )
+    if not allowed:
+        raise Http404('No lesson matches the given query.')
+    
+    asset = getattr(lesson, LESSON_ASSET_FIELDS[kind])
+    if not asset:
+        raise Http404('This lesson has no such file.')
+    return serve_file(request, asset)
+
+@login_required
+@require_POST
+def sync_progress(request, pk):
+    """Apply a batch of lesson completions from an offline or mobile client"""
+    course = get_object_or_404(Course, pk=pk)
+    enrollment = Enrollment.objects.filter(student=request.user, course=course).first()
+    if enrollment is None:
+        return JsonResponse({'success': False, 'error': 'You are not enrolled in this course.'}, status=403)
+    
+    try:
+        records = json.loads(request.body)['records']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'success': False, 'error': 'Expected a JSON object with a "records" list.'}, status=400)
+    if not isinstance(records, list) or len(records) > settings.PROGRESS_SYNC_MAX_RECORDS:
+        return JsonResponse({
+            'success': False,
+            'error': f'"records" must be a list of at most {settings.PROGRESS_SYNC_MAX_RECORDS} items.',
+        }, status=400)
+    
+    try:
+        newly_completed = enrollment.sync_progress(records, get_outline(course))
+    except ValidationError as e:
+        return JsonResponse({'success': False, 'error': ' '.join(e.messages)}, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'newly_completed': newly_completed,
+        'lessons_completed': enrollment.lessons_completed,
+        'progress': enrollment.progress_percentage,
+        'next_lesson': enrollment.next_lesson_id,
+    })
+
+@login_required
+@require_POST
+def lesson_heartbeat(request, course_pk, lesson_pk):
+    """Time-on-lesson ping from the lesson player; buffered, never written inline"""
+    course = get_object_or_404(Course, pk=course_pk)
+    if lesson_pk not in get_outline(course):
+        raise Http404('No lesson matches the given query.')
+    enrollment_id = Enrollment.objects.filter(student=request.user, course=course).values_list('pk', flat=True).first()
+    if enrollment_id is None:
+        return JsonResponse({'success': False, 'error': 'You are not enrolled in this course.'}, status=403)
+    
+    interval = settings.LESSON_HEARTBEAT_INTERVAL
+    try:
+        seconds = int(request.POST.get('seconds', interval))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid seconds.'}, status=400)
+    # Clamp so a client cannot claim more time than two missed pings
+    seconds = max(0, min(seconds, 2 * interval))
+    
+    accepted = heartbeat_buffer.add(enrollment_id, lesson_pk, seconds)
+    return JsonResponse({'success': accepted, 'interval': interval})
+
+@user_passes_test(lambda user: user.is_staff)
+def heartbeat_stats(request):
+    return JsonResponse(heartbeat_buffer.stats())
+
 @user_passes_test(is_instructor)
 def instructor_courses(request):
     """Instructor's course management"""
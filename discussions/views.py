@@ -1,9 +1,10 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import Discussion
+from .models import Discussion, Reply
 from .forms import DiscussionForm, ReplyForm
 from courses.models import Course
+from django_elms.pagination import paginate_by_cursor
 
 @login_required
 def discussion_list(request, course_pk):
@@ -27,10 +28,12 @@ def discussion_detail(request, course_pk, discussion_pk):
     else:
         form = ReplyForm()
     
+    replies = paginate_by_cursor(request, discussion.replies.select_related('author'), ['created_at'], 20)
     context = {
         'course': discussion.course,
         'discussion': discussion,
-        'replies': discussion.replies.select_related('author').all(),
+        'replies': replies,
+        'page_obj': replies,
         'form': form,
     }
     return render(request, 'discussions/discussion_detail.html', context)
\ No newline at end of file
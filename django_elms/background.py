@@ -0,0 +1,42 @@
+"""
+In-process background execution for short, idempotent jobs (image
+derivatives and the like) that should not run on the request path.
+
+Jobs are queued once the surrounding transaction commits, run on a small
+thread pool, and release their database connection when done. Anything
+longer-running or that must survive a restart belongs in a management
+command instead.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.BACKGROUND_WORKERS, thread_name_prefix='background')
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background job %s failed', getattr(func, '__qualname__', func))
+    finally:
+        close_old_connections()
+
+
+def run_in_background(func, *args, **kwargs):
+    """Run ``func`` on the background pool after the current transaction commits"""
+    if not settings.BACKGROUND_WORKERS:
+        transaction.on_commit(partial(func, *args, **kwargs))
+        return
+    transaction.on_commit(lambda: get_executor().submit(_run, func, args, kwargs))
@@ -0,0 +1,75 @@
+"""
+Pillow helpers for derived image variants.
+
+render_variants() decodes a source image once and writes one file per
+(width, format) pair. File names embed a hash of the source bytes, so a
+re-upload produces new URLs that can be cached forever while re-running
+the job for the same upload reuses the existing files. Each record writes
+into its own variant_directory(), so two records that upload the same
+image never share files and deleting one cannot break the other.
+"""
+import hashlib
+import io
+import posixpath
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def render_variants(source, widths, formats, directory, square=False, storage=default_storage):
+    """
+    Write resized copies of ``source`` (an opened file or FieldFile) and
+    return {'width': .., 'height': .., format: {width: name}}. Widths larger
+    than the source are skipped, but the smallest is always produced.
+    """
+    data = source.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    stem = posixpath.splitext(posixpath.basename(source.name))[0][:40]
+
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        if square:
+            side = min(image.size)
+            image = ImageOps.fit(image, (side, side))
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if image.mode in ('LA', 'PA') or 'transparency' in image.info else 'RGB')
+        image.load()
+    width, height = image.size
+    targets = sorted({min(w, width) for w in widths})
+
+    variants = {'width': width, 'height': height}
+    for target in targets:
+        resized = image if target == width else image.resize(
+            (target, max(round(height * target / width), 1)), Image.Resampling.LANCZOS
+        )
+        for fmt in formats:
+            pil_format, options = FORMATS[fmt]
+            name = posixpath.join(directory, f'{stem}.{digest}.{target}.{fmt}')
+            if not storage.exists(name):
+                frame = resized.convert('RGB') if pil_format == 'JPEG' and resized.mode != 'RGB' else resized
+                buffer = io.BytesIO()
+                frame.save(buffer, pil_format, **options)
+                name = storage.save(name, ContentFile(buffer.getvalue()))
+            variants.setdefault(fmt, {})[str(target)] = name
+    return variants
+
+
+def variant_directory(base, owner_pk):
+    return posixpath.join(base, str(owner_pk))
+
+
+def variant_names(variants):
+    return {name for fmt in FORMATS for name in variants.get(fmt, {}).values()}
+
+
+def delete_variants(names, directory, storage=default_storage):
+    """Delete variant files under ``directory``; names outside it belong to an older shared layout and are kept"""
+    prefix = directory.rstrip('/') + '/'
+    for name in names:
+        if name.startswith(prefix):
+            storage.delete(name)
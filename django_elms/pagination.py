@@ -0,0 +1,124 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are fetched with ``WHERE (sort keys) > (last row's keys)`` instead of
+OFFSET, so deep pages cost the same as the first one and no COUNT(*) is run.
+Orderings must be on non-null columns; the primary key is appended as a
+tiebreaker so every row has a unique position.
+"""
+import base64
+import binascii
+import datetime
+import json
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder truncates to milliseconds; keys must round-trip exactly
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.keys = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        if not self.keys or self.keys[-1][0] not in ('pk', queryset.model._meta.pk.name):
+            self.keys.append(('pk', self.keys[0][1] if self.keys else False))
+
+    def page(self, cursor=None):
+        values, backwards = self.decode(cursor) if cursor else (None, False)
+        ordering = [('-' if descending != backwards else '') + name for name, descending in self.keys]
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(values, backwards))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        has_next = True if backwards else has_more
+        has_previous = has_more if backwards else values is not None
+
+        return CursorPage(
+            rows,
+            next_cursor=self.encode(rows[-1], False) if rows and has_next else None,
+            previous_cursor=self.encode(rows[0], True) if rows and has_previous else None,
+        )
+
+    def _after(self, values, backwards):
+        """Rows strictly past ``values`` in (possibly reversed) ordering"""
+        condition = Q()
+        for index, (name, descending) in enumerate(self.keys):
+            lookup = 'lt' if descending != backwards else 'gt'
+            step = Q(**{f'{name}__{lookup}': values[index]})
+            for (prefix, _), value in zip(self.keys[:index], values):
+                step &= Q(**{prefix: value})
+            condition |= step
+        return condition
+
+    def encode(self, obj, backwards):
+        values = [getattr(obj, name) for name, _ in self.keys]
+        payload = json.dumps([values, backwards], cls=CursorEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values, backwards = json.loads(base64.urlsafe_b64decode(padded))
+            if len(values) != len(self.keys):
+                raise ValueError
+            return [self._to_python(name, value) for (name, _), value in zip(self.keys, values)], bool(backwards)
+        except (TypeError, ValueError, binascii.Error, ValidationError):
+            raise InvalidCursor('Invalid cursor')
+
+    def _to_python(self, name, value):
+        opts = self.queryset.model._meta
+        try:
+            field = opts.pk if name == 'pk' else opts.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations (e.g. search rank) are plain JSON scalars
+            return value
+        return field.to_python(value)
+
+
+def paginate_by_cursor(request, queryset, ordering, per_page, param='cursor'):
+    """Return the CursorPage requested by ``request``; malformed cursors 404 like ListView pages"""
+    try:
+        return CursorPaginator(queryset, ordering, per_page).page(request.GET.get(param))
+    except InvalidCursor:
+        raise Http404('Invalid cursor')
@@ -70,6 +70,16 @@ DATABASES = {
     }
 }
 
+# Cache
+# The per-process memory cache is only suitable for development. In production use a cache
+# shared by every worker (e.g. django.core.cache.backends.redis.RedisCache): quiz autosave
+# drafts (quizzes.drafts) are buffered here and must be visible to whichever worker resumes them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -101,6 +111,19 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Lesson videos and documents live outside MEDIA_ROOT and have no public URL;
+# they are only served through courses.views.lesson_asset after the enrollment check.
+PROTECTED_MEDIA_ROOT = BASE_DIR / 'protected_media'
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'protected': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': PROTECTED_MEDIA_ROOT, 'base_url': None},
+    },
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -112,4 +135,70 @@ LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'users:login'
 
 # Tailwind
-TAILWIND_APP_NAME = 'theme'
\ No newline at end of file
+TAILWIND_APP_NAME = 'theme'
+
+# Course search
+# Dotted path to a courses.search.BaseSearchBackend; None picks FTS5 on SQLite.
+COURSE_SEARCH_BACKEND = None
+COURSE_SEARCH_MAX_RESULTS = 500
+
+# Unfiltered catalog facet counts are cached for this many seconds
+CATALOG_FACETS_TIMEOUT = 300
+
+# Course outlines are keyed by Course.outline_version, so this only bounds memory
+COURSE_OUTLINE_TIMEOUT = 60 * 60 * 24
+
+# Largest batch accepted by the lesson progress sync endpoint
+PROGRESS_SYNC_MAX_RECORDS = 500
+
+# Lesson player heartbeats (seconds); see courses.heartbeats
+LESSON_HEARTBEAT_INTERVAL = 15
+LESSON_HEARTBEAT_FLUSH_INTERVAL = 60
+LESSON_HEARTBEAT_MAX_ENTRIES = 10000
+
+# How long a reserved seat on a capped course is held before it is released
+SEAT_RESERVATION_MINUTES = 15
+
+# Protected media (lesson assets); see django_elms.streaming
+# MEDIA_OFFLOAD hands the transfer to the front-end server: None, 'x-accel-redirect' or 'x-sendfile'.
+# For nginx, MEDIA_OFFLOAD_PREFIXES maps each STORAGES alias to an internal location aliased
+# to that storage's root: 'protected' (lesson files) to PROTECTED_MEDIA_ROOT and 'default'
+# (certificates) to MEDIA_ROOT.
+MEDIA_OFFLOAD = None
+MEDIA_OFFLOAD_PREFIXES = {
+    'default': '/internal-media/',
+    'protected': '/protected-media/',
+}
+MEDIA_STREAM_CHUNK_SIZE = 64 * 1024
+
+# Threads for django_elms.background jobs; 0 runs them inline after commit
+BACKGROUND_WORKERS = 2
+
+# Responsive course thumbnails; see courses.thumbnails
+COURSE_THUMBNAIL_WIDTHS = (320, 640, 960)
+COURSE_THUMBNAIL_FORMATS = ('webp', 'jpeg')
+
+# Square avatar variants generated by users.avatars
+USER_AVATAR_SIZES = (48, 96, 300)
+
+# Certificate render queue; see certificates.rendering
+CERTIFICATE_WORKER_PROCESSES = 2
+CERTIFICATE_RENDER_TIMEOUT = 300  # seconds before a RENDERING row is considered abandoned
+CERTIFICATE_MAX_ATTEMPTS = 3
+CERTIFICATE_STATUS_POLL_SECONDS = 2
+
+# Public certificate verification summaries (seconds); unknown IDs are cached briefly
+CERTIFICATE_VERIFY_TIMEOUT = 60 * 60 * 24
+CERTIFICATE_VERIFY_MISSING_TIMEOUT = 60
+
+# Quiz snapshots are keyed by Quiz.version, so this only bounds memory
+QUIZ_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+# Quiz item analysis skips attempts completed within this many seconds (they may still be committing)
+QUIZ_ANALYTICS_SETTLE_SECONDS = 60
+
+# Timed quiz attempts; see quizzes.drafts and the sweep_quiz_attempts command
+QUIZ_AUTOSAVE_SECONDS = 5  # how often the take page posts its answers
+QUIZ_DRAFT_PERSIST_SECONDS = 30  # autosaves reach the database at most this often, and always within this of the deadline
+QUIZ_DRAFT_CACHE_TIMEOUT = 60 * 60 * 24
+QUIZ_DEADLINE_GRACE_SECONDS = 30  # allowance for a final submit in flight at the deadline
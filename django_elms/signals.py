@@ -0,0 +1,13 @@
+"""Helpers shared by the apps' signal handlers"""
+from django.db.models import QuerySet
+
+
+def deleted_via(origin, *models):
+    """
+    True if the delete() call behind a post_delete signal was made on one of
+    ``models`` (an instance or a queryset of it) rather than on a row that
+    cascaded to this one.
+    """
+    if isinstance(origin, QuerySet):
+        return origin.model in models
+    return isinstance(origin, models)
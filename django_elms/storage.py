@@ -0,0 +1,12 @@
+"""
+Storage for files that must never be reachable by URL.
+
+FileFields pass protected_storage (a callable, so migrations reference it
+rather than a configured instance); the files are served by views that
+check access first, via django_elms.streaming.serve_file.
+"""
+from django.core.files.storage import storages
+
+
+def protected_storage():
+    return storages['protected']
@@ -0,0 +1,141 @@
+"""
+Serving stored files with HTTP Range support, validators and optional
+front-end server offload.
+
+serve_file() handles conditional requests (ETag / Last-Modified), single
+byte ranges (206 / 416) and streams the file from storage in fixed-size
+chunks. With MEDIA_OFFLOAD set, only the headers are produced and nginx
+(X-Accel-Redirect) or Apache/lighttpd (X-Sendfile) pushes the bytes;
+X-Accel-Redirect uses the MEDIA_OFFLOAD_PREFIXES location of the file's
+storage.
+"""
+import mimetypes
+import re
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import storages
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.encoding import iri_to_uri
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """
+    Return (start, end) inclusive for a single byte range, None when the
+    header should be ignored, or False when it cannot be satisfied.
+    Multi-range requests are answered with the full body.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def iter_file(storage, name, start, length, chunk_size):
+    """Yield ``length`` bytes of ``name`` from ``start``; the file is opened lazily on first iteration"""
+    with storage.open(name, 'rb') as fileobj:
+        fileobj.seek(start)
+        while length > 0:
+            chunk = fileobj.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def storage_alias(storage):
+    """The STORAGES alias ``storage`` was configured under, or None"""
+    # default_storage is a lazy wrapper around storages['default']
+    storage = getattr(storage, '_wrapped', storage)
+    for alias in settings.STORAGES:
+        if storages[alias] is storage:
+            return alias
+    return None
+
+
+def offload_response(fieldfile):
+    mode = settings.MEDIA_OFFLOAD
+    response = HttpResponse()
+    if mode == 'x-accel-redirect':
+        # Each storage has its own root, so each needs its own internal location
+        alias = storage_alias(fieldfile.storage)
+        prefix = settings.MEDIA_OFFLOAD_PREFIXES.get(alias)
+        if prefix is None:
+            raise ImproperlyConfigured(f'MEDIA_OFFLOAD_PREFIXES has no location for the {alias!r} storage.')
+        response['X-Accel-Redirect'] = iri_to_uri(prefix.rstrip('/') + '/' + fieldfile.name)
+    elif mode == 'x-sendfile':
+        response['X-Sendfile'] = fieldfile.path
+    else:
+        raise ValueError(f'Unknown MEDIA_OFFLOAD mode: {mode}')
+    return response
+
+
+def serve_file(request, fieldfile, etag=None, filename=None, as_attachment=False, content_type=None):
+    """Respond with a stored file, honouring Range and conditional request headers"""
+    storage = fieldfile.storage
+    size = fieldfile.size
+    last_modified = storage.get_modified_time(fieldfile.name).timestamp()
+    if etag is None:
+        etag = f'{int(last_modified):x}-{size:x}'
+    etag = quote_etag(etag)
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if response is None:
+        filename = filename or fieldfile.name.rsplit('/', 1)[-1]
+        if settings.MEDIA_OFFLOAD:
+            response = offload_response(fieldfile)
+        else:
+            response = _stream_response(request, fieldfile, size, etag, last_modified)
+        response['Content-Type'] = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Files behind an access check must not be stored by shared caches
+    patch_cache_control(response, private=True)
+    return response
+
+
+def _stream_response(request, fieldfile, size, etag, last_modified):
+    byte_range = None
+    if 'Range' in request.headers and _if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(request.headers['Range'], size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    response = StreamingHttpResponse(
+        iter_file(fieldfile.storage, fieldfile.name, start, length, settings.MEDIA_STREAM_CHUNK_SIZE),
+        status=206 if byte_range else 200,
+    )
+    response['Content-Length'] = str(length)
+    if byte_range:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+def _if_range_matches(request, etag, last_modified):
+    """Only honour Range when If-Range is absent or still describes the current file"""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(last_modified)
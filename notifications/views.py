@@ -1,6 +1,7 @@
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
+from django_elms.pagination import paginate_by_cursor
 from users.models import Notification
 
 @login_required
@@ -13,5 +14,6 @@ def notification_list(request):
         notification.save()
         return JsonResponse({'success': True})
     
-    context = {'notifications': notifications}
+    page = paginate_by_cursor(request, notifications, ['-created_at'], 20)
+    context = {'notifications': page, 'page_obj': page}
     return render(request, 'notifications/notification_list.html', context)
\ No newline at end of file
@@ -0,0 +1,246 @@
+"""
+Item analysis for quizzes: difficulty (p-value), point-biserial
+discrimination, distractor selection rates and Cronbach's alpha.
+
+Attempts are read in chunks and turned into an attempts x questions score
+matrix with NumPy; each chunk only contributes additive sums (counts, sums
+of scores, squares and cross products), which are stored in QuizStatistics
+and QuestionStatistics. New attempts are folded in later without reading
+the old ones again, and every statistic is derived from the stored sums.
+
+With question pools an attempt only sees some questions. The draw is
+rebuilt from the attempt's seed, and each question's statistics use only
+the attempts that were shown it.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import QuestionStatistics, QuizAttempt, QuizStatistics, StudentAnswer
+from .snapshot import drawn_question_ids, get_snapshot
+
+
+@dataclass
+class Sums:
+    """Additive item-analysis totals for ``k`` questions"""
+    attempts: int
+    sum_total: float
+    sum_total_sq: float
+    answered: np.ndarray
+    correct: np.ndarray
+    sum_score: np.ndarray
+    sum_score_sq: np.ndarray
+    sum_score_total: np.ndarray
+    choices: dict  # answer id -> selections
+    # Per question, over the attempts shown it: how many, and their sums of totals and squared totals
+    shown: np.ndarray
+    shown_sum_total: np.ndarray
+    shown_sum_total_sq: np.ndarray
+
+    @classmethod
+    def empty(cls, k):
+        return cls(
+            0, 0.0, 0.0, np.zeros(k), np.zeros(k), np.zeros(k), np.zeros(k), np.zeros(k), {},
+            np.zeros(k), np.zeros(k), np.zeros(k),
+        )
+
+    def __iadd__(self, other):
+        self.attempts += other.attempts
+        self.sum_total += other.sum_total
+        self.sum_total_sq += other.sum_total_sq
+        for name in (
+            'answered', 'correct', 'sum_score', 'sum_score_sq', 'sum_score_total',
+            'shown', 'shown_sum_total', 'shown_sum_total_sq',
+        ):
+            getattr(self, name).__iadd__(getattr(other, name))
+        for answer_id, count in other.choices.items():
+            self.choices[answer_id] = self.choices.get(answer_id, 0) + count
+        return self
+
+
+def chunk_sums(attempt_ids, answers, question_ids, shown=None):
+    """
+    Sums for one chunk. ``attempt_ids`` and ``question_ids`` are sorted int
+    arrays; ``answers`` is an (m, 5) int array of attempt id, question id,
+    selected answer id (0 for none), is_correct and points earned. Answers
+    to questions outside ``question_ids`` are ignored; attempts without
+    answers count as all-zero rows. ``shown`` is an optional (n, k) bool
+    mask of the questions each attempt was shown; by default all of them.
+    """
+    n, k = len(attempt_ids), len(question_ids)
+    attempt, question, selected, correct, points = answers.T if len(answers) else np.zeros((5, 0), dtype=np.int64)
+    cols = np.searchsorted(question_ids, question)
+    known = (cols < k) & (question_ids[np.minimum(cols, k - 1)] == question) if k else np.zeros(len(question), bool)
+    rows, cols = np.searchsorted(attempt_ids, attempt[known]), cols[known]
+
+    scores = np.bincount(rows * k + cols, weights=points[known], minlength=n * k).reshape(n, k)
+    totals = scores.sum(axis=1)
+    picked = selected[known]
+    answer_ids, counts = np.unique(picked[picked > 0], return_counts=True)
+    shown = np.ones((n, k)) if shown is None else shown.astype(float)
+    return Sums(
+        attempts=n,
+        sum_total=float(totals.sum()),
+        sum_total_sq=float(totals @ totals),
+        answered=np.bincount(cols, minlength=k).astype(float),
+        correct=np.bincount(cols, weights=correct[known], minlength=k),
+        sum_score=scores.sum(axis=0),
+        sum_score_sq=(scores * scores).sum(axis=0),
+        sum_score_total=scores.T @ totals,
+        choices=dict(zip(answer_ids.tolist(), counts.tolist())),
+        shown=shown.sum(axis=0),
+        shown_sum_total=shown.T @ totals,
+        shown_sum_total_sq=shown.T @ (totals * totals),
+    )
+
+
+def derive(sums):
+    """
+    (difficulty, discrimination, alpha) from the stored sums; NaN where
+    undefined. Each question is measured over the attempts shown it. Alpha
+    needs every attempt to see every question, so it is None when a pool
+    left some questions out.
+    """
+    n = sums.attempts
+    k = len(sums.sum_score)
+    if n == 0:
+        nan = np.full(k, np.nan)
+        return nan, nan, None
+    shown = sums.shown
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_x = sums.sum_score / shown
+        var_x = sums.sum_score_sq / shown - mean_x ** 2
+        mean_t = sums.shown_sum_total / shown
+        var_t = sums.shown_sum_total_sq / shown - mean_t ** 2
+        cov_xt = sums.sum_score_total / shown - mean_x * mean_t
+        # Correlate each item with the rest of the quiz so it is not compared with itself
+        var_rest = var_t + var_x - 2 * cov_xt
+        discrimination = (cov_xt - var_x) / np.sqrt(var_x * var_rest)
+        discrimination[(shown == 0) | (var_x <= 1e-12) | (var_rest <= 1e-12)] = np.nan
+        difficulty = np.where(shown > 0, sums.correct / shown, np.nan)
+    alpha = None
+    total_var = sums.sum_total_sq / n - (sums.sum_total / n) ** 2
+    if k > 1 and total_var > 1e-12 and np.all(shown == n):
+        alpha = float(k / (k - 1) * (1 - var_x.sum() / total_var))
+    return difficulty, discrimination, alpha
+
+
+def _load_sums(stats, question_stats, question_ids):
+    sums = Sums.empty(len(question_ids))
+    sums.attempts, sums.sum_total, sums.sum_total_sq = stats.attempts, stats.sum_total, stats.sum_total_sq
+    for index, question_id in enumerate(question_ids.tolist()):
+        row = question_stats.get(question_id)
+        if row is None:
+            continue
+        sums.answered[index] = row.answered
+        sums.correct[index] = row.correct
+        sums.sum_score[index] = row.sum_score
+        sums.sum_score_sq[index] = row.sum_score_sq
+        sums.sum_score_total[index] = row.sum_score_total
+        sums.shown[index] = row.shown
+        sums.shown_sum_total[index] = row.shown_sum_total
+        sums.shown_sum_total_sq[index] = row.shown_sum_total_sq
+        sums.choices.update({int(answer_id): count for answer_id, count in row.choice_counts.items()})
+    return sums
+
+
+def _shown_mask(quiz, version, attempt_ids, question_ids, snapshots):
+    """
+    (n, k) mask of the questions each attempt in ``attempt_ids`` was shown,
+    rebuilt from its seed and quiz version; None when every attempt saw all
+    of the current questions.
+    """
+    pooled = QuizAttempt.objects.filter(
+        Q(question_pool_size__isnull=False) | ~Q(quiz_version=version),
+        pk__in=attempt_ids.tolist(),
+    ).only(
+        'pk', 'seed', 'quiz_version', 'randomize_questions', 'randomize_choices', 'question_pool_size',
+    )
+    mask = None
+    columns = {question_id: index for index, question_id in enumerate(question_ids.tolist())}
+    for attempt in pooled:
+        if attempt.quiz_version not in snapshots:
+            snapshots[attempt.quiz_version] = get_snapshot(quiz, attempt.quiz_version)
+        drawn = drawn_question_ids(snapshots[attempt.quiz_version], attempt, attempt.seed)
+        if mask is None:
+            mask = np.ones((len(attempt_ids), len(question_ids)), dtype=bool)
+        row = np.searchsorted(attempt_ids, attempt.pk)
+        mask[row] = False
+        mask[row, [columns[question_id] for question_id in drawn if question_id in columns]] = True
+    return mask
+
+
+def analyze_quiz(quiz, chunk_size=5000, full=False):
+    """
+    Fold attempts completed since the last run into the quiz's statistics;
+    returns the number of attempts added. Everything is recomputed with
+    ``full`` or when the questions have changed since the last run.
+    """
+    snapshot = get_snapshot(quiz)
+    snapshots = {snapshot.version: snapshot}
+    question_ids = np.array(sorted(question.id for question in snapshot.questions), dtype=np.int64)
+    answer_question = {choice.id: question.id for question in snapshot.questions for choice in question.choices}
+    # Attempts graded in the last few seconds may still be committing; leave them for the next run
+    cutoff = timezone.now() - timedelta(seconds=settings.QUIZ_ANALYTICS_SETTLE_SECONDS)
+
+    with transaction.atomic():
+        stats, _ = QuizStatistics.objects.select_for_update().get_or_create(quiz=quiz)
+        if full or stats.quiz_version != snapshot.version:
+            stats.quiz_version = snapshot.version
+            stats.attempts, stats.sum_total, stats.sum_total_sq, stats.analyzed_until = 0, 0.0, 0.0, None
+            QuestionStatistics.objects.filter(quiz=quiz).delete()
+        question_stats = {row.question_id: row for row in QuestionStatistics.objects.filter(quiz=quiz)}
+        sums = _load_sums(stats, question_stats, question_ids)
+
+        attempts = QuizAttempt.objects.filter(quiz=quiz, completed_at__isnull=False, completed_at__lte=cutoff)
+        if stats.analyzed_until:
+            attempts = attempts.filter(completed_at__gt=stats.analyzed_until)
+        attempt_ids = np.fromiter(attempts.order_by('pk').values_list('pk', flat=True), dtype=np.int64)
+
+        for start in range(0, len(attempt_ids), chunk_size):
+            chunk = attempt_ids[start:start + chunk_size]
+            rows = StudentAnswer.objects.filter(attempt_id__in=chunk.tolist()).values_list(
+                'attempt_id', 'question_id', Coalesce(F('selected_answer_id'), Value(0)), 'is_correct', 'points_earned',
+            )
+            answers = np.array(list(rows), dtype=np.int64).reshape(-1, 5)
+            sums += chunk_sums(chunk, answers, question_ids, _shown_mask(quiz, snapshot.version, chunk, question_ids, snapshots))
+
+        difficulty, discrimination, alpha = derive(sums)
+        choice_counts = {}
+        for answer_id, count in sums.choices.items():
+            if answer_id in answer_question:
+                choice_counts.setdefault(answer_question[answer_id], {})[str(answer_id)] = count
+
+        QuestionStatistics.objects.bulk_create(
+            [
+                QuestionStatistics(
+                    quiz=quiz, question_id=question_id,
+                    answered=int(sums.answered[i]), correct=int(sums.correct[i]),
+                    sum_score=sums.sum_score[i], sum_score_sq=sums.sum_score_sq[i],
+                    sum_score_total=sums.sum_score_total[i],
+                    shown=int(sums.shown[i]), shown_sum_total=sums.shown_sum_total[i],
+                    shown_sum_total_sq=sums.shown_sum_total_sq[i],
+                    choice_counts=choice_counts.get(question_id, {}),
+                    difficulty=None if np.isnan(difficulty[i]) else float(difficulty[i]),
+                    discrimination=None if np.isnan(discrimination[i]) else float(discrimination[i]),
+                )
+                for i, question_id in enumerate(question_ids.tolist())
+            ],
+            update_conflicts=True,
+            unique_fields=['quiz', 'question'],
+            update_fields=[
+                'answered', 'correct', 'sum_score', 'sum_score_sq', 'sum_score_total',
+                'shown', 'shown_sum_total', 'shown_sum_total_sq',
+                'choice_counts', 'difficulty', 'discrimination',
+            ],
+        )
+        stats.attempts = sums.attempts
+        stats.sum_total, stats.sum_total_sq = sums.sum_total, sums.sum_total_sq
+        stats.cronbach_alpha = alpha
+        stats.analyzed_until = cutoff
+        stats.save()
+    return len(attempt_ids)
@@ -0,0 +1,67 @@
+"""
+Cache-backed draft buffer for quiz autosave.
+
+Every autosave merges into the attempt's draft in the cache; the database
+copy (QuizAttempt.draft) is only written when it is older than
+QUIZ_DRAFT_PERSIST_SECONDS, so an attempt costs one UPDATE per interval
+rather than one per keystroke. Within that interval of a timed attempt's
+deadline every autosave is written through, so the database copy is
+complete when the attempt expires and the sweep_quiz_attempts command
+grades from the database alone. Use a cache shared by every worker process
+(Redis, Memcached) in production so a resumed attempt sees the latest
+buffered answers whichever worker serves it.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from .models import QuizAttempt
+
+
+def _key(attempt_id):
+    return f'quizzes:draft:{attempt_id}'
+
+
+def _decode(draft):
+    # JSON object keys are strings; responses are keyed by question id
+    return {int(question_id): value for question_id, value in draft.items()}
+
+
+def load(attempt):
+    """The latest responses for ``attempt``: the buffered draft, else the persisted one"""
+    draft = cache.get(_key(attempt.pk))
+    return _decode(draft if draft is not None else attempt.draft)
+
+
+def load_persisted(attempts):
+    """{attempt id: responses} from the database copies, for grading expired attempts"""
+    return {attempt.pk: _decode(attempt.draft) for attempt in attempts}
+
+
+def save(attempt, responses):
+    """
+    Merge ``responses`` into the buffered draft. Returns True when this call
+    also wrote the draft to the database.
+    """
+    draft = {str(question_id): value for question_id, value in load(attempt).items()}
+    draft.update({str(question_id): value for question_id, value in responses.items()})
+    cache.set(_key(attempt.pk), draft, settings.QUIZ_DRAFT_CACHE_TIMEOUT)
+
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.QUIZ_DRAFT_PERSIST_SECONDS)
+    attempts = QuizAttempt.objects.open().filter(pk=attempt.pk)
+    seconds_left = attempt.seconds_left
+    if seconds_left is None or seconds_left > settings.QUIZ_DRAFT_PERSIST_SECONDS:
+        if attempt.draft_saved_at is not None and attempt.draft_saved_at >= stale:
+            return False
+        # Conditional so concurrent autosaves for the same attempt persist once
+        attempts = attempts.filter(Q(draft_saved_at__isnull=True) | Q(draft_saved_at__lt=stale))
+    persisted = bool(attempts.update(draft=draft, draft_saved_at=now))
+    if persisted:
+        attempt.draft, attempt.draft_saved_at = draft, now
+    return persisted
+
+
+def discard(attempt_ids):
+    cache.delete_many([_key(attempt_id) for attempt_id in attempt_ids])
@@ -5,7 +5,7 @@ class QuizForm(forms.ModelForm):
     class Meta:
         model = Quiz
         fields = ['title', 'description', 'time_limit_minutes', 'passing_score', 
-                 'randomize_questions', 'show_correct_answers', 'max_attempts']
+                 'randomize_questions', 'randomize_choices', 'question_pool_size', 'show_correct_answers', 'max_attempts']
         widgets = {
             'description': forms.Textarea(attrs={'rows': 3}),
         }
@@ -0,0 +1,170 @@
+"""
+Set-based quiz grading.
+
+Submissions are graded in memory against the cached quiz snapshot
+(quizzes.snapshot), arranged for the attempt's seed, and the results are written with one bulk_create plus
+one UPDATE of the attempt inside a single transaction. Attempts are started
+server-side (start()) so timed quizzes have a deadline to enforce;
+grade_many() auto-submits expired attempts in bulk.
+"""
+from datetime import timedelta
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from .models import QuizAttempt, StudentAnswer
+from courses.models import Enrollment
+from .snapshot import arrange, get_snapshot, new_seed
+
+GRADED_FIELDS = ['score', 'passed', 'completed_at', 'quiz_version']
+
+
+def responses_from_post(data, questions):
+    """Pick the ``question_<id>`` fields for ``questions`` out of a submitted form"""
+    return {
+        question.id: data[f'question_{question.id}']
+        for question in questions
+        if f'question_{question.id}' in data
+    }
+
+
+def start(student, quiz):
+    """
+    Resume the student's open attempt or open a new one, with a deadline
+    when the quiz has a time limit; returns None once quiz.max_attempts is
+    used up. The check and the insert run under a lock on the student's
+    enrollment, so concurrent requests cannot both pass the limit. The quiz
+    version and draw settings are copied onto the attempt so the questions
+    it shows and grades against stay fixed if the quiz is edited.
+    """
+    with transaction.atomic():
+        Enrollment.objects.select_for_update().filter(student=student, course_id=quiz.course_id).values_list('pk').first()
+        attempts = QuizAttempt.objects.filter(student=student, quiz=quiz)
+        attempt = attempts.open().order_by('-started_at').first()
+        if attempt is not None:
+            return attempt
+        if attempts.count() >= quiz.max_attempts:
+            return None
+        deadline = None
+        if quiz.time_limit_minutes:
+            deadline = timezone.now() + timedelta(minutes=quiz.time_limit_minutes)
+        return QuizAttempt.objects.create(
+            student=student, quiz=quiz, seed=new_seed(), deadline=deadline, quiz_version=quiz.version,
+            randomize_questions=quiz.randomize_questions, randomize_choices=quiz.randomize_choices,
+            question_pool_size=quiz.question_pool_size,
+        )
+
+
+def attempt_snapshot(attempt):
+    """The snapshot of the quiz version ``attempt`` started on"""
+    return get_snapshot(attempt.quiz, attempt.quiz_version)
+
+
+def claim(attempt_ids):
+    """
+    Mark open attempts as completed so nothing else grades them; returns
+    the ids this call claimed. Call inside the transaction that grades them.
+    """
+    claimed_at = timezone.now()
+    QuizAttempt.objects.open().filter(pk__in=attempt_ids).update(completed_at=claimed_at)
+    return set(QuizAttempt.objects.filter(pk__in=attempt_ids, completed_at=claimed_at).values_list('pk', flat=True))
+
+
+def check_choices(responses, questions):
+    """Raise ValidationError if a choice answer in ``responses`` does not belong to its question"""
+    errors = _invalid_choices(responses, {question.id: question for question in questions})
+    if errors:
+        raise ValidationError(errors)
+
+
+def _choice_id(question, value):
+    try:
+        answer_id = int(value)
+    except (TypeError, ValueError):
+        return None
+    return answer_id if any(choice.id == answer_id for choice in question.choices) else None
+
+
+def _invalid_choices(responses, questions):
+    return [
+        ValidationError(
+            'Answer %(answer)s is not a choice for question %(question)s.',
+            code='invalid_choice', params={'answer': value, 'question': question_id},
+        )
+        for question_id, value in responses.items()
+        if question_id in questions and questions[question_id].is_choice
+        and _choice_id(questions[question_id], value) is None
+    ]
+
+
+def score(attempt, responses, snapshot, strict=True):
+    """
+    Score ``responses`` ({question id: answer id or text}) against the
+    questions ``snapshot`` gives this attempt's seed, setting the graded
+    fields on ``attempt`` without saving; returns the unsaved StudentAnswer
+    rows. Answers to questions outside the attempt's draw are ignored.
+    Choice answers that do not belong to their question raise
+    ValidationError, or are dropped when ``strict`` is False.
+    """
+    questions = {question.id: question for question in arrange(snapshot, attempt, attempt.seed)}
+    if strict:
+        errors = _invalid_choices(responses, questions)
+        if errors:
+            raise ValidationError(errors)
+    rows = []
+    total_points = 0
+    for question_id, value in responses.items():
+        question = questions.get(question_id)
+        if question is None:
+            continue
+        if question.is_choice:
+            answer_id = _choice_id(question, value)
+            if answer_id is None:
+                continue
+            is_correct = answer_id in question.correct
+            rows.append(StudentAnswer(
+                attempt=attempt, question_id=question_id, selected_answer_id=answer_id,
+                is_correct=is_correct, points_earned=question.points if is_correct else 0,
+            ))
+        else:
+            # Short answers are stored for manual grading
+            rows.append(StudentAnswer(attempt=attempt, question_id=question_id, text_answer=str(value)))
+        total_points += rows[-1].points_earned
+
+    max_points = sum(question.points for question in questions.values())
+    attempt.score = round(total_points / max_points * 100) if max_points > 0 else 0
+    attempt.passed = attempt.score >= attempt.quiz.passing_score
+    attempt.completed_at = timezone.now()
+    attempt.quiz_version = snapshot.version
+    return rows
+
+
+def grade(attempt, responses, snapshot):
+    """
+    Grade ``responses`` and store the result on ``attempt``. Raises
+    ValidationError, writing nothing, if a choice answer does not belong to
+    its question.
+    """
+    rows = score(attempt, responses, snapshot)
+    with transaction.atomic():
+        StudentAnswer.objects.bulk_create(rows)
+        attempt.save(update_fields=GRADED_FIELDS)
+    return attempt
+
+
+def grade_many(attempts, responses):
+    """
+    Grade ``attempts`` with ``responses`` ({attempt id: responses}) using
+    one bulk_create and one bulk_update. Invalid choices are dropped rather
+    than failing the batch.
+    """
+    snapshots = {}
+    rows = []
+    for attempt in attempts:
+        key = (attempt.quiz_id, attempt.quiz_version)
+        if key not in snapshots:
+            snapshots[key] = attempt_snapshot(attempt)
+        rows.extend(score(attempt, responses.get(attempt.pk, {}), snapshots[key], strict=False))
+    with transaction.atomic():
+        StudentAnswer.objects.bulk_create(rows)
+        QuizAttempt.objects.bulk_update(attempts, GRADED_FIELDS)
+    return attempts
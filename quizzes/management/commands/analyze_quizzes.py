@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand
+from quizzes.analytics import analyze_quiz
+from quizzes.models import Quiz
+
+
+class Command(BaseCommand):
+    help = 'Fold newly completed attempts into the stored item-analysis statistics'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, action='append', help='Only these quiz IDs; may be repeated')
+        parser.add_argument('--full', action='store_true', help='Recompute from every attempt instead of only new ones')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Attempts read per query')
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.all()
+        if options['quiz']:
+            quizzes = quizzes.filter(pk__in=options['quiz'])
+        started = time.perf_counter()
+        total = 0
+        for quiz in quizzes.iterator():
+            added = analyze_quiz(quiz, chunk_size=options['chunk_size'], full=options['full'])
+            total += added
+            if added:
+                self.stdout.write(f'{quiz}: {added} attempts added')
+        self.stdout.write(self.style.SUCCESS(
+            f'Analyzed {total} attempts in {time.perf_counter() - started:.1f}s.'
+        ))
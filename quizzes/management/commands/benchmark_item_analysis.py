@@ -0,0 +1,53 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from quizzes.analytics import Sums, chunk_sums, derive
+
+
+class Command(BaseCommand):
+    help = 'Time the vectorized item-analysis kernels on a synthetic answer set (no database access)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--answers', type=int, default=1_000_000)
+        parser.add_argument('--questions', type=int, default=50)
+        parser.add_argument('--choices', type=int, default=4)
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Attempts per chunk, as in analyze_quiz')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        k, choices = options['questions'], options['choices']
+        n = max(options['answers'] // k, 1)
+
+        # Students of varying ability answering questions of varying difficulty
+        ability = rng.normal(size=n)
+        hardness = rng.normal(size=k)
+        correct = rng.random((n, k)) < 1 / (1 + np.exp(hardness - ability[:, None]))
+        question_ids = np.arange(1, k + 1, dtype=np.int64)
+        first_choice = question_ids * 10
+        wrong_choice = rng.integers(1, choices, size=(n, k))
+        selected = np.where(correct, first_choice, first_choice + wrong_choice)
+        attempt_ids = np.arange(1, n + 1, dtype=np.int64)
+        answers = np.column_stack([
+            np.repeat(attempt_ids, k), np.tile(question_ids, n), selected.ravel(), correct.ravel(), correct.ravel(),
+        ]).astype(np.int64)
+
+        started = time.perf_counter()
+        sums = Sums.empty(k)
+        chunk = options['chunk_size']
+        for start in range(0, n, chunk):
+            rows = answers[start * k:(start + chunk) * k]
+            sums += chunk_sums(attempt_ids[start:start + chunk], rows, question_ids)
+        accumulated = time.perf_counter() - started
+        difficulty, discrimination, alpha = derive(sums)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f'{len(answers):,} answers ({n:,} attempts x {k} questions): '
+            f'accumulate {accumulated:.2f}s, derive {elapsed - accumulated:.4f}s, '
+            f'{len(answers) / elapsed:,.0f} answers/s'
+        )
+        self.stdout.write(
+            f'difficulty {np.nanmin(difficulty):.2f}-{np.nanmax(difficulty):.2f}, '
+            f'mean discrimination {np.nanmean(discrimination):.2f}, alpha {alpha:.3f}'
+        )
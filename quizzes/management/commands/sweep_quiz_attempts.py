@@ -0,0 +1,45 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from quizzes import drafts
+from quizzes.grading import claim, grade_many
+from quizzes.models import QuizAttempt
+from users.models import Notification
+
+
+class Command(BaseCommand):
+    help = 'Submit timed attempts whose deadline has passed with their saved answers; run every minute'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Attempts handled per query')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        started = time.perf_counter()
+
+        submitted = 0
+        expired_ids = list(
+            QuizAttempt.objects.expired(settings.QUIZ_DEADLINE_GRACE_SECONDS).order_by('pk').values_list('pk', flat=True)
+        )
+        for start in range(0, len(expired_ids), batch_size):
+            with transaction.atomic():
+                claimed = claim(expired_ids[start:start + batch_size])
+                attempts = list(QuizAttempt.objects.filter(pk__in=claimed).select_related('quiz'))
+                # Drafts are written through near the deadline, so the database copy is complete
+                grade_many(attempts, drafts.load_persisted(attempts))
+                Notification.objects.bulk_create([
+                    Notification(
+                        user_id=attempt.student_id,
+                        notification_type='quiz_graded',
+                        title=f'Quiz "{attempt.quiz.title}" Graded',
+                        message=f'Time ran out on {attempt.quiz.title}; you scored {attempt.score}%',
+                    )
+                    for attempt in attempts
+                ])
+            drafts.discard(claimed)
+            submitted += len(attempts)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Submitted {submitted} expired attempts in {time.perf_counter() - started:.1f}s.'
+        ))
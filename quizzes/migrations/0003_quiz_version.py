@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Bumped whenever a question or answer changes'),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='quiz_version',
+            field=models.PositiveIntegerField(blank=True, help_text='Quiz.version the attempt was graded against', null=True),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0003_quiz_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answered', models.PositiveIntegerField(default=0)),
+                ('correct', models.PositiveIntegerField(default=0)),
+                ('sum_score', models.FloatField(default=0)),
+                ('sum_score_sq', models.FloatField(default=0)),
+                ('sum_score_total', models.FloatField(default=0)),
+                ('choice_counts', models.JSONField(blank=True, default=dict, help_text='Selections per answer id')),
+                ('difficulty', models.FloatField(blank=True, help_text='Share of attempts answering correctly (p-value)', null=True)),
+                ('discrimination', models.FloatField(blank=True, help_text='Point-biserial correlation with the rest of the quiz', null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuizStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('sum_total', models.FloatField(default=0)),
+                ('sum_total_sq', models.FloatField(default=0)),
+                ('cronbach_alpha', models.FloatField(blank=True, null=True)),
+                ('quiz_version', models.PositiveIntegerField(blank=True, help_text='Quiz.version the totals were built for', null=True)),
+                ('analyzed_until', models.DateTimeField(blank=True, help_text='Attempts completed up to this time are included', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['quiz', 'completed_at'], name='attempt_quiz_completed_idx'),
+        ),
+        migrations.AddField(
+            model_name='questionstatistics',
+            name='question',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='quizzes.question'),
+        ),
+        migrations.AddField(
+            model_name='questionstatistics',
+            name='quiz',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_statistics', to='quizzes.quiz'),
+        ),
+        migrations.AddField(
+            model_name='quizstatistics',
+            name='quiz',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='quizzes.quiz'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='questionstatistics',
+            unique_together={('quiz', 'question')},
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0004_quiz_item_statistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='question_pool_size',
+            field=models.PositiveIntegerField(blank=True, help_text='Questions drawn per attempt; blank uses all of them', null=True),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='randomize_choices',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='seed',
+            field=models.PositiveIntegerField(blank=True, help_text='Seeds the question draw and ordering (quizzes.snapshot.arrange)', null=True),
+        ),
+    ]
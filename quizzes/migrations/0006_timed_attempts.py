@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0005_quiz_randomization'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='deadline',
+            field=models.DateTimeField(blank=True, help_text='When the attempt is submitted automatically; empty for untimed quizzes', null=True),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='draft',
+            field=models.JSONField(blank=True, default=dict, help_text='Autosaved answers, persisted in batches from quizzes.drafts'),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='draft_saved_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['completed_at', 'deadline'], name='attempt_open_deadline_idx'),
+        ),
+    ]
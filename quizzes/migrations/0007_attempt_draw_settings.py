@@ -0,0 +1,73 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:36
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_draw_settings(apps, schema_editor):
+    """Give existing attempts their quiz's current draw settings and rebuild the item analysis"""
+    Quiz = apps.get_model('quizzes', 'Quiz')
+    QuizAttempt = apps.get_model('quizzes', 'QuizAttempt')
+    QuizStatistics = apps.get_model('quizzes', 'QuizStatistics')
+    quiz = Quiz.objects.filter(pk=OuterRef('quiz_id'))
+    QuizAttempt.objects.update(
+        randomize_questions=Subquery(quiz.values('randomize_questions')[:1]),
+        randomize_choices=Subquery(quiz.values('randomize_choices')[:1]),
+        question_pool_size=Subquery(quiz.values('question_pool_size')[:1]),
+    )
+    QuizAttempt.objects.filter(quiz_version__isnull=True).update(
+        quiz_version=Subquery(quiz.values('version')[:1]),
+    )
+    # Stored per-question sums predate the shown counts
+    QuizStatistics.objects.update(quiz_version=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0006_timed_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionstatistics',
+            name='shown',
+            field=models.PositiveIntegerField(default=0, help_text='Attempts that were shown the question'),
+        ),
+        migrations.AddField(
+            model_name='questionstatistics',
+            name='shown_sum_total',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='questionstatistics',
+            name='shown_sum_total_sq',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='question_pool_size',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='randomize_choices',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='randomize_questions',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='questionstatistics',
+            name='difficulty',
+            field=models.FloatField(blank=True, help_text='Share of the attempts shown the question that answered correctly (p-value)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='quizattempt',
+            name='quiz_version',
+            field=models.PositiveIntegerField(blank=True, help_text='Quiz.version the attempt was started and graded on', null=True),
+        ),
+        migrations.RunPython(copy_draw_settings, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,16 @@
+from datetime import timedelta
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from users.models import User
 from courses.models import Course, Lesson
 
+class QuizQuerySet(models.QuerySet):
+    def bump_version(self):
+        """Invalidate cached snapshots (quizzes.snapshot) for these quizzes"""
+        return self.update(version=F('version') + 1)
+
 class Quiz(models.Model):
     """Quiz/Assessment model"""
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='quizzes')
@@ -12,12 +20,26 @@ class Quiz(models.Model):
     time_limit_minutes = models.IntegerField(blank=True, null=True)
     passing_score = models.IntegerField(default=70, validators=[MinValueValidator(0), MaxValueValidator(100)])
     randomize_questions = models.BooleanField(default=False)
+    randomize_choices = models.BooleanField(default=False)
+    question_pool_size = models.PositiveIntegerField(blank=True, null=True, help_text="Questions drawn per attempt; blank uses all of them")
     show_correct_answers = models.BooleanField(default=True)
     max_attempts = models.IntegerField(default=3)
+    version = models.PositiveIntegerField(default=1, editable=False, help_text="Bumped whenever a question or answer changes")
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = QuizQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.course.title} - {self.title}"
+    
+    def save(self, *args, **kwargs):
+        # version is maintained with F() updates by quizzes.signals; a full save() must not overwrite it
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'version'
+            ]
+        super().save(*args, **kwargs)
 
 class Question(models.Model):
     """Quiz questions"""
@@ -39,6 +61,12 @@ class Question(models.Model):
     
     def __str__(self):
         return f"Q{self.order}: {self.question_text[:50]}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_quiz_id = instance.__dict__.get('quiz_id')
+        return instance
 
 class Answer(models.Model):
     """Answer choices for questions"""
@@ -52,6 +80,21 @@ class Answer(models.Model):
     
     def __str__(self):
         return self.answer_text
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_question_id = instance.__dict__.get('question_id')
+        return instance
+
+class QuizAttemptQuerySet(models.QuerySet):
+    def open(self):
+        """Attempts that have been started but not graded"""
+        return self.filter(completed_at__isnull=True)
+    
+    def expired(self, grace=0):
+        """Open attempts whose deadline passed more than ``grace`` seconds ago"""
+        return self.open().filter(deadline__lt=timezone.now() - timedelta(seconds=grace))
 
 class QuizAttempt(models.Model):
     """Student quiz attempts"""
@@ -61,12 +104,37 @@ class QuizAttempt(models.Model):
     completed_at = models.DateTimeField(blank=True, null=True)
     score = models.IntegerField(default=0)
     passed = models.BooleanField(default=False)
+    quiz_version = models.PositiveIntegerField(blank=True, null=True, help_text="Quiz.version the attempt was started and graded on")
+    seed = models.PositiveIntegerField(blank=True, null=True, help_text="Seeds the question draw and ordering (quizzes.snapshot.arrange)")
+    # Copied from the quiz when the attempt starts so later edits cannot change its draw
+    randomize_questions = models.BooleanField(default=False)
+    randomize_choices = models.BooleanField(default=False)
+    question_pool_size = models.PositiveIntegerField(blank=True, null=True)
+    deadline = models.DateTimeField(blank=True, null=True, help_text="When the attempt is submitted automatically; empty for untimed quizzes")
+    draft = models.JSONField(default=dict, blank=True, help_text="Autosaved answers, persisted in batches from quizzes.drafts")
+    draft_saved_at = models.DateTimeField(blank=True, null=True)
+    
+    objects = QuizAttemptQuerySet.as_manager()
     
     class Meta:
         unique_together = ['student', 'quiz', 'started_at']
+        indexes = [
+            models.Index(fields=['quiz', 'completed_at'], name='attempt_quiz_completed_idx'),
+            models.Index(fields=['completed_at', 'deadline'], name='attempt_open_deadline_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.username} - {self.quiz.title} - {self.score}%"
+    
+    @property
+    def seconds_left(self):
+        """Whole seconds until the deadline, or None for untimed attempts"""
+        if self.deadline is None:
+            return None
+        return max(0, int((self.deadline - timezone.now()).total_seconds()))
+    
+    def is_expired(self, grace=0):
+        return self.deadline is not None and timezone.now() > self.deadline + timedelta(seconds=grace)
 
 class StudentAnswer(models.Model):
     """Student responses to quiz questions"""
@@ -75,4 +143,44 @@ class StudentAnswer(models.Model):
     selected_answer = models.ForeignKey(Answer, on_delete=models.CASCADE, blank=True, null=True)
     text_answer = models.TextField(blank=True)  # For short answer questions
     is_correct = models.BooleanField(default=False)
-    points_earned = models.IntegerField(default=0)
\ No newline at end of file
+    points_earned = models.IntegerField(default=0)
+
+class QuizStatistics(models.Model):
+    """
+    Running item-analysis totals for a quiz, maintained by quizzes.analytics.
+    Only additive sums are stored so new attempts can be folded in without
+    re-reading old ones.
+    """
+    quiz = models.OneToOneField(Quiz, on_delete=models.CASCADE, related_name='statistics')
+    attempts = models.PositiveIntegerField(default=0)
+    sum_total = models.FloatField(default=0)
+    sum_total_sq = models.FloatField(default=0)
+    cronbach_alpha = models.FloatField(blank=True, null=True)
+    quiz_version = models.PositiveIntegerField(blank=True, null=True, help_text="Quiz.version the totals were built for")
+    analyzed_until = models.DateTimeField(blank=True, null=True, help_text="Attempts completed up to this time are included")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Statistics - {self.quiz.title}"
+
+class QuestionStatistics(models.Model):
+    """Per-question running totals and the derived difficulty and discrimination"""
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='question_statistics')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='statistics')
+    answered = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    sum_score = models.FloatField(default=0)
+    sum_score_sq = models.FloatField(default=0)
+    sum_score_total = models.FloatField(default=0)
+    shown = models.PositiveIntegerField(default=0, help_text="Attempts that were shown the question")
+    shown_sum_total = models.FloatField(default=0)
+    shown_sum_total_sq = models.FloatField(default=0)
+    choice_counts = models.JSONField(default=dict, blank=True, help_text="Selections per answer id")
+    difficulty = models.FloatField(blank=True, null=True, help_text="Share of the attempts shown the question that answered correctly (p-value)")
+    discrimination = models.FloatField(blank=True, null=True, help_text="Point-biserial correlation with the rest of the quiz")
+    
+    class Meta:
+        unique_together = ['quiz', 'question']
+    
+    def __str__(self):
+        return f"Statistics - {self.question}"
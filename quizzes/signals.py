@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Answer, Question, Quiz
+from django_elms.signals import deleted_via
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, **kwargs):
+    quiz_ids = {instance.quiz_id, getattr(instance, '_loaded_quiz_id', instance.quiz_id)}
+    Quiz.objects.filter(pk__in=quiz_ids).bump_version()
+    instance._loaded_quiz_id = instance.quiz_id
+
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, origin=None, **kwargs):
+    if not deleted_via(origin, Quiz):
+        Quiz.objects.filter(pk=instance.quiz_id).bump_version()
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def answer_changed(sender, instance, origin=None, **kwargs):
+    # Deleting a question or quiz bumps the version once from question_deleted
+    if not deleted_via(origin, Question, Quiz):
+        question_ids = {instance.question_id, getattr(instance, '_loaded_question_id', instance.question_id)}
+        Quiz.objects.filter(questions__in=question_ids).bump_version()
+        instance._loaded_question_id = instance.question_id
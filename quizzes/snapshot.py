@@ -0,0 +1,144 @@
+"""
+Compiled, versioned quiz content shared by the take page and the grader.
+
+Snapshots are cached under the quiz's ``version``, which quizzes.signals
+bumps whenever a question or answer is saved or deleted, so a stale snapshot
+is never read and an unchanged quiz costs no question queries.
+"""
+import random
+import secrets
+from dataclasses import dataclass, replace
+from django.conf import settings
+from django.core.cache import cache
+from .models import Answer, Question
+
+CHOICE_TYPES = ('multiple_choice', 'true_false')
+
+
+@dataclass(frozen=True)
+class SnapshotChoice:
+    id: int
+    text: str
+    order: int
+
+
+@dataclass(frozen=True)
+class SnapshotQuestion:
+    id: int
+    text: str
+    question_type: str
+    points: int
+    explanation: str
+    order: int
+    choices: tuple
+    correct: frozenset
+
+    @property
+    def is_choice(self):
+        return self.question_type in CHOICE_TYPES
+
+
+class QuizSnapshot:
+    def __init__(self, quiz_id, version, questions):
+        self.quiz_id = quiz_id
+        self.version = version
+        self.questions = tuple(questions)
+        self._by_id = {question.id: question for question in self.questions}
+        self.max_points = sum(question.points for question in self.questions)
+
+    def __contains__(self, question_id):
+        return question_id in self._by_id
+
+    def question(self, question_id):
+        return self._by_id.get(question_id)
+
+
+def snapshot_cache_key(quiz_id, version):
+    return f'quizzes:snapshot:{quiz_id}:{version}'
+
+
+def build_snapshot(quiz):
+    """Load questions and choices with two queries"""
+    choices = {}
+    for answer_id, question_id, text, is_correct, order in (
+        Answer.objects.filter(question__quiz=quiz).order_by('order', 'pk')
+        .values_list('id', 'question_id', 'answer_text', 'is_correct', 'order')
+    ):
+        choices.setdefault(question_id, []).append((SnapshotChoice(answer_id, text, order), is_correct))
+    questions = [
+        SnapshotQuestion(
+            question_id, text, question_type, points, explanation, order,
+            choices=tuple(choice for choice, _ in choices.get(question_id, ())),
+            correct=frozenset(choice.id for choice, is_correct in choices.get(question_id, ()) if is_correct),
+        )
+        for question_id, text, question_type, points, explanation, order in Question.objects.filter(quiz=quiz)
+        .order_by('order', 'pk')
+        .values_list('id', 'question_text', 'question_type', 'points', 'explanation', 'order')
+    ]
+    return QuizSnapshot(quiz.pk, quiz.version, questions)
+
+
+def get_snapshot(quiz, version=None):
+    """
+    The snapshot for ``quiz``, or for an earlier ``version`` of it (the one
+    an attempt started on). Earlier versions are only kept in the cache;
+    once evicted, the current questions are returned instead.
+    """
+    if version is not None and version != quiz.version:
+        snapshot = cache.get(snapshot_cache_key(quiz.pk, version))
+        if snapshot is not None:
+            return snapshot
+    key = snapshot_cache_key(quiz.pk, quiz.version)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_snapshot(quiz)
+        cache.set(key, snapshot, settings.QUIZ_SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def new_seed():
+    return secrets.randbits(31)
+
+
+def _draw(questions, options, rng):
+    pool = options.question_pool_size
+    if pool and pool < len(questions):
+        if options.randomize_questions:
+            return rng.sample(questions, pool)
+        # Selection sampling keeps the draw in quiz order without sorting
+        drawn, needed = [], pool
+        for remaining, question in zip(range(len(questions), 0, -1), questions):
+            if rng.random() * remaining < needed:
+                drawn.append(question)
+                needed -= 1
+        return drawn
+    if options.randomize_questions:
+        rng.shuffle(questions)
+    return questions
+
+
+def arrange(snapshot, options, seed):
+    """
+    The questions, in order and with their choice order, that the attempt
+    seeded with ``seed`` sees. ``options`` supplies randomize_questions,
+    randomize_choices and question_pool_size: pass the attempt, which
+    copies them from the quiz when it starts, so editing the quiz cannot
+    reshuffle an attempt in progress. Only the seed and those settings are
+    stored; the same inputs always rebuild the same arrangement in O(N).
+    """
+    questions = list(snapshot.questions)
+    if seed is None:
+        return tuple(questions)
+    rng = random.Random(seed)
+    questions = _draw(questions, options, rng)
+    if options.randomize_choices:
+        questions = [replace(question, choices=tuple(rng.sample(question.choices, len(question.choices)))) for question in questions]
+    return tuple(questions)
+
+
+def drawn_question_ids(snapshot, options, seed):
+    """Ids of the questions arrange() would show, without shuffling any choices"""
+    pool = options.question_pool_size
+    if seed is None or not pool or pool >= len(snapshot.questions):
+        return {question.id for question in snapshot.questions}
+    return {question.id for question in _draw(list(snapshot.questions), options, random.Random(seed))}
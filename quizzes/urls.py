@@ -5,4 +5,6 @@ app_name = 'quizzes'
 
 urlpatterns = [
     path('<int:quiz_pk>/take/', views.quiz_take, name='quiz_take'),
-]
\ No newline at end of file
+    path('attempts/<int:attempt_pk>/autosave/', views.quiz_autosave, name='quiz_autosave'),
+    path('<int:quiz_pk>/analytics/', views.quiz_analytics, name='quiz_analytics'),
+]
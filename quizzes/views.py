@@ -1,12 +1,20 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.utils import timezone
-from django.http import JsonResponse
-from .models import Quiz, QuizAttempt, StudentAnswer, Answer
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_POST
+from .models import QuestionStatistics, Quiz, QuizAttempt, QuizStatistics
+from . import drafts
+from .analytics import analyze_quiz
+from .grading import attempt_snapshot, check_choices, claim, grade, grade_many, responses_from_post, start
+from .snapshot import arrange, get_snapshot
 from .forms import QuizForm
 from courses.models import Course, Enrollment
 from users.models import Notification
+from users.views import is_instructor
 
 @login_required
 def quiz_take(request, quiz_pk):
@@ -15,44 +23,27 @@ def quiz_take(request, quiz_pk):
         messages.error(request, 'You need to enroll in the course to take this quiz.')
         return redirect('courses:course_detail', pk=quiz.course.pk)
     
-    # Check attempt limit
-    attempts = QuizAttempt.objects.filter(student=request.user, quiz=quiz).count()
-    if attempts >= quiz.max_attempts:
-        messages.error(request, 'You have reached the maximum number of attempts.')
-        return redirect('courses:course_detail', pk=quiz.course.pk)
-    
+    attempt = QuizAttempt.objects.open().filter(student=request.user, quiz=quiz).order_by('-started_at').first()
     if request.method == 'POST':
-        attempt = QuizAttempt.objects.create(student=request.user, quiz=quiz)
-        total_points = 0
-        max_points = sum(q.points for q in quiz.questions.all())
-        
-        for question in quiz.questions.all():
-            answer_key = f'question_{question.id}'
-            if answer_key in request.POST:
-                if question.question_type in ['multiple_choice', 'true_false']:
-                    selected_answer_id = request.POST.get(answer_key)
-                    selected_answer = Answer.objects.get(id=selected_answer_id)
-                    is_correct = selected_answer.is_correct
-                    points_earned = question.points if is_correct else 0
-                else:  # short_answer
-                    text_answer = request.POST.get(answer_key)
-                    is_correct = False  # Requires manual grading
-                    points_earned = 0
-                
-                StudentAnswer.objects.create(
-                    attempt=attempt,
-                    question=question,
-                    selected_answer=selected_answer if question.question_type in ['multiple_choice', 'true_false'] else None,
-                    text_answer=text_answer if question.question_type == 'short_answer' else '',
-                    is_correct=is_correct,
-                    points_earned=points_earned
-                )
-                total_points += points_earned
-        
-        attempt.score = (total_points / max_points) * 100 if max_points > 0 else 0
-        attempt.passed = attempt.score >= quiz.passing_score
-        attempt.completed_at = timezone.now()
-        attempt.save()
+        if attempt is None:
+            messages.error(request, 'This attempt has already been submitted.')
+            return redirect('courses:course_learn', pk=quiz.course.pk)
+        attempt.quiz = quiz
+        snapshot = attempt_snapshot(attempt)
+        responses = drafts.load(attempt)
+        # Past the deadline only what was autosaved in time counts
+        if not attempt.is_expired(settings.QUIZ_DEADLINE_GRACE_SECONDS):
+            responses.update(responses_from_post(request.POST, arrange(snapshot, attempt, attempt.seed)))
+        try:
+            with transaction.atomic():
+                if not claim([attempt.pk]):
+                    messages.error(request, 'This attempt has already been submitted.')
+                    return redirect('courses:course_learn', pk=quiz.course.pk)
+                grade(attempt, responses, snapshot)
+        except ValidationError:
+            messages.error(request, 'Your submission contained an invalid answer. Please try again.')
+            return redirect('quizzes:quiz_take', quiz_pk=quiz.pk)
+        drafts.discard([attempt.pk])
         
         Notification.objects.create(
             user=request.user,
@@ -64,9 +55,99 @@ def quiz_take(request, quiz_pk):
         messages.success(request, f'Quiz submitted! Your score: {attempt.score}%')
         return redirect('courses:course_learn', pk=quiz.course.pk)
     
+    if attempt is not None and attempt.is_expired(settings.QUIZ_DEADLINE_GRACE_SECONDS):
+        # Submit what was autosaved now rather than waiting for the sweeper
+        with transaction.atomic():
+            if claim([attempt.pk]):
+                grade_many([attempt], drafts.load_persisted([attempt]))
+                Notification.objects.create(
+                    user=request.user,
+                    notification_type='quiz_graded',
+                    title=f'Quiz "{quiz.title}" Graded',
+                    message=f'Time ran out on {quiz.title}; you scored {attempt.score}%'
+                )
+            else:
+                attempt.refresh_from_db()
+        drafts.discard([attempt.pk])
+        messages.info(request, f'Time ran out, so your saved answers were submitted. Your score: {attempt.score}%')
+        return redirect('courses:course_learn', pk=quiz.course.pk)
+    
+    if attempt is None:
+        # Open attempts count towards the limit, so reloading resumes instead of starting over
+        attempt = start(request.user, quiz)
+        if attempt is None:
+            messages.error(request, 'You have reached the maximum number of attempts.')
+            return redirect('courses:course_detail', pk=quiz.course.pk)
+    attempts = QuizAttempt.objects.filter(student=request.user, quiz=quiz).count()
+    
+    attempt.quiz = quiz
+    questions = arrange(attempt_snapshot(attempt), attempt, attempt.seed)
+    responses = drafts.load(attempt)
     context = {
         'quiz': quiz,
-        'questions': quiz.questions.prefetch_related('answers').all(),
-        'attempt_number': attempts + 1,
+        'attempt': attempt,
+        'questions': questions,
+        # Saved answers alongside their questions so a reload picks up where the student left off
+        'items': [(question, responses.get(question.id)) for question in questions],
+        'seconds_left': attempt.seconds_left,
+        'autosave_seconds': settings.QUIZ_AUTOSAVE_SECONDS,
+        'attempt_number': attempts,
     }
-    return render(request, 'quizzes/quiz_take.html', context)
\ No newline at end of file
+    return render(request, 'quizzes/quiz_take.html', context)
+
+@login_required
+@require_POST
+def quiz_autosave(request, attempt_pk):
+    """Buffer the answers posted by the take page; see quizzes.drafts"""
+    attempt = get_object_or_404(QuizAttempt.objects.select_related('quiz'), pk=attempt_pk, student=request.user)
+    if attempt.completed_at is not None or attempt.is_expired(settings.QUIZ_DEADLINE_GRACE_SECONDS):
+        return JsonResponse({'success': False, 'error': 'This attempt is closed'}, status=409)
+    
+    questions = arrange(attempt_snapshot(attempt), attempt, attempt.seed)
+    responses = responses_from_post(request.POST, questions)
+    try:
+        check_choices(responses, questions)
+    except ValidationError:
+        return JsonResponse({'success': False, 'error': 'Invalid answer'}, status=400)
+    drafts.save(attempt, responses)
+    return JsonResponse({'success': True, 'seconds_left': attempt.seconds_left})
+
+@login_required
+@user_passes_test(is_instructor)
+def quiz_analytics(request, quiz_pk):
+    """Item analysis for the quiz's instructor, read from the stored statistics"""
+    quiz = get_object_or_404(Quiz.objects.select_related('course'), pk=quiz_pk)
+    if quiz.course.instructor_id != request.user.pk and not request.user.is_staff:
+        raise Http404('No quiz matches the given query.')
+    
+    if request.method == 'POST':
+        added = analyze_quiz(quiz)
+        messages.success(request, f'Statistics updated with {added} new attempts.')
+        return redirect('quizzes:quiz_analytics', quiz_pk=quiz.pk)
+    
+    stats = QuizStatistics.objects.filter(quiz=quiz).first()
+    question_stats = {row.question_id: row for row in QuestionStatistics.objects.filter(quiz=quiz)}
+    rows = []
+    for question in get_snapshot(quiz).questions:
+        row = question_stats.get(question.id)
+        counts = row.choice_counts if row else {}
+        # Pooled questions are only shown to some attempts
+        attempts = row.shown if row else 0
+        rows.append({
+            'question': question,
+            'stats': row,
+            'choices': [
+                {
+                    'choice': choice,
+                    'is_correct': choice.id in question.correct,
+                    'rate': counts.get(str(choice.id), 0) / attempts * 100 if attempts else 0,
+                }
+                for choice in question.choices
+            ],
+        })
+    
+    return render(request, 'quizzes/quiz_analytics.html', {
+        'quiz': quiz,
+        'stats': stats,
+        'rows': rows,
+    })
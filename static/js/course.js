@@ -25,6 +25,91 @@ document.addEventListener("DOMContentLoaded", function () {
     });
   });
 
+  // Time-on-lesson heartbeat
+  const player = document.querySelector("[data-heartbeat-url]");
+  if (player) {
+    const interval = Number(player.dataset.heartbeatInterval || 15);
+    setInterval(function () {
+      if (document.hidden) {
+        return;
+      }
+      fetch(player.dataset.heartbeatUrl, {
+        method: "POST",
+        headers: {
+          "X-CSRFToken": document.querySelector("[name=csrfmiddlewaretoken]")
+            .value,
+          "Content-Type": "application/x-www-form-urlencoded",
+        },
+        body: `seconds=${interval}`,
+      });
+    }, interval * 1000);
+  }
+
+  // Quiz autosave and countdown
+  const quizForm = document.querySelector("form[data-autosave-url]");
+  if (quizForm) {
+    const autosaveSeconds = Number(quizForm.dataset.autosaveSeconds || 5);
+    let dirty = false;
+    quizForm.addEventListener("change", function () {
+      dirty = true;
+    });
+    quizForm.addEventListener("input", function () {
+      dirty = true;
+    });
+    setInterval(function () {
+      if (!dirty) {
+        return;
+      }
+      dirty = false;
+      fetch(quizForm.dataset.autosaveUrl, {
+        method: "POST",
+        headers: { "X-Requested-With": "XMLHttpRequest" },
+        body: new FormData(quizForm),
+      }).then((response) => {
+        if (response.status === 409) {
+          window.location.reload();
+        } else if (!response.ok) {
+          dirty = true;
+        }
+      });
+    }, autosaveSeconds * 1000);
+
+    if (quizForm.dataset.secondsLeft) {
+      const deadline = Date.now() + Number(quizForm.dataset.secondsLeft) * 1000;
+      const countdown = document.querySelector(".quiz-countdown");
+      const tick = setInterval(function () {
+        const left = Math.max(0, Math.round((deadline - Date.now()) / 1000));
+        if (countdown) {
+          countdown.textContent = `${Math.floor(left / 60)}:${String(left % 60).padStart(2, "0")}`;
+        }
+        if (left === 0) {
+          clearInterval(tick);
+          quizForm.submit();
+        }
+      }, 1000);
+    }
+  }
+
+  // Certificate render status
+  const certificate = document.querySelector("[data-certificate-status-url]");
+  if (certificate) {
+    const poll = Number(certificate.dataset.pollSeconds || 2);
+    const timer = setInterval(function () {
+      fetch(certificate.dataset.certificateStatusUrl)
+        .then((response) => response.json())
+        .then((data) => {
+          if (data.status === "ready") {
+            clearInterval(timer);
+            window.location.reload();
+          } else if (data.status === "failed") {
+            clearInterval(timer);
+            certificate.querySelector(".certificate-state").textContent =
+              "Something went wrong while preparing your certificate. Reload the page to try again.";
+          }
+        });
+    }, poll * 1000);
+  }
+
   // Notification mark as read
   const notificationItems = document.querySelectorAll(".notification-item");
   notificationItems.forEach((item) => {
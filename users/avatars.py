@@ -0,0 +1,36 @@
+"""
+Sized avatar variants, generated in the background when User.avatar changes
+(see users.signals) so saving a user never touches image files.
+"""
+from django.conf import settings
+from django_elms.images import delete_variants, render_variants, variant_directory, variant_names
+from .models import User
+
+VARIANT_DIRECTORY = 'avatars/variants'
+
+
+def avatar_directory(user_id):
+    return variant_directory(VARIANT_DIRECTORY, user_id)
+
+
+def generate_avatar_variants(user_id):
+    user = User.objects.only('avatar', 'avatar_variants').filter(pk=user_id).first()
+    if user is None:
+        return False
+    old = user.avatar_variants or {}
+    if not user.avatar:
+        variants = {}
+    elif old.get('source') == user.avatar.name:
+        return False
+    else:
+        with user.avatar.open('rb') as source:
+            variants = render_variants(
+                source, settings.USER_AVATAR_SIZES, ('webp', 'jpeg'), avatar_directory(user_id), square=True,
+            )
+        variants['source'] = user.avatar.name
+
+    # A newer upload wins; its own job will store its variants
+    updated = User.objects.filter(pk=user_id, avatar=user.avatar.name or '').update(avatar_variants=variants)
+    if updated:
+        delete_variants(variant_names(old) - variant_names(variants), avatar_directory(user_id))
+    return bool(updated)
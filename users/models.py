@@ -1,7 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.core.files.storage import default_storage
 from django.core.validators import MinValueValidator, MaxValueValidator
-from PIL import Image
 
 class User(AbstractUser):
     """Extended User model with roles"""
@@ -15,15 +15,36 @@ class User(AbstractUser):
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
     phone = models.CharField(max_length=15, blank=True)
     date_of_birth = models.DateField(blank=True, null=True)
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Square avatar files by format and size")
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_avatar = instance.__dict__.get('avatar')
+        instance._loaded_username = instance.__dict__.get('username')
+        return instance
     
     def save(self, *args, **kwargs):
+        # avatar_variants is written by a background job; a stale full save must not clobber it
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'avatar_variants'
+            ]
         super().save(*args, **kwargs)
-        if self.avatar:
-            img = Image.open(self.avatar.path)
-            if img.height > 300 or img.width > 300:
-                output_size = (300, 300)
-                img.thumbnail(output_size)
-                img.save(self.avatar.path)
+    
+    def avatar_url_for(self, size):
+        """URL of the smallest generated avatar at least ``size`` pixels wide, else the original upload"""
+        variants = (self.avatar_variants or {}).get('jpeg')
+        if not variants:
+            return self.avatar.url if self.avatar else ''
+        widths = sorted(int(width) for width in variants)
+        width = next((w for w in widths if w >= size), widths[-1])
+        return default_storage.url(variants[str(width)])
+    
+    @property
+    def avatar_thumbnail_url(self):
+        return self.avatar_url_for(96)
 
 class Notification(models.Model):
     """User notifications"""
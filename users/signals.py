@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django_elms.background import run_in_background
+from django_elms.images import delete_variants, variant_names
+from .avatars import avatar_directory, generate_avatar_variants
+from .models import User
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # Logins save with update_fields=['last_login'], so they never reach the avatar check
+    if update_fields is not None and 'avatar' not in update_fields:
+        return
+    avatar = instance.avatar.name or ''
+    if avatar != (getattr(instance, '_loaded_avatar', None) or ''):
+        run_in_background(generate_avatar_variants, instance.pk)
+    instance._loaded_avatar = avatar
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    if instance.avatar_variants:
+        run_in_background(delete_variants, variant_names(instance.avatar_variants), avatar_directory(instance.pk))